@@ -0,0 +1,315 @@
+# 向量化回测：指标 -> 仓位 -> 收益、回撤、换手率、胜率
+# 仓位数组的形状为(参数组数, 品种数, 天数)，1做多，-1做空，0空仓，
+# 第t天收盘时只根据第t天及以前的数据决定仓位，赚第t + 1天的涨跌幅，
+# 不会用到未来的数据
+# 参数网格按块分给多个进程；walk_forward在每个训练窗口上为每个品种
+# 选出最优参数，再到紧接着的测试窗口上按这组参数交易
+# 用法：python backtest.py [-s sma] [-j 4] [-c 0.001] \
+#           [--train 500 --test 100] store | a.csv b.csv ...
+
+import os
+import sys
+import argparse
+import multiprocessing as mpc
+import numpy as np
+from indicators import sweep_sma, sweep_sbb, sweep_predict
+from screener import load, calc_levels
+
+
+TRADING_DAYS = 252
+
+
+def fill_gaps(values):
+    '''
+    缺数据的天沿用前一天的价格，否则一个nan会让之后所有的滑动窗口
+    都变成nan；第一个价格之前(上市前)仍为nan
+    '''
+    values = np.asarray(values, dtype='f8')
+    indices = np.where(~np.isnan(values), np.arange(values.shape[-1]),
+                       0)
+    np.maximum.accumulate(indices, axis=-1, out=indices)
+    return np.take_along_axis(values, indices, -1)
+
+
+def listing_days(closing_prices):
+    '''每个品种第一个有收盘价的天，没有数据的品种为天数'''
+    valid = ~np.isnan(closing_prices)
+    return np.where(valid.any(axis=-1), valid.argmax(axis=-1),
+                    valid.shape[-1])
+
+
+def shift_left(values, firsts):
+    '''
+    每个品种的数据左移firsts天，从上市当天开始，末尾沿用最后一个价格，
+    补的部分移回去时超出范围，不会被用到；没有数据的品种全为0
+    '''
+    n = values.shape[-1]
+    indices = np.minimum(np.arange(n) + firsts[..., np.newaxis], n - 1)
+    return np.nan_to_num(np.take_along_axis(values, indices, -1))
+
+
+def shift_right(positions, firsts):
+    '''shift_left的逆运算，仓位移回原来的天，上市前空仓'''
+    n = positions.shape[-1]
+    indices = np.broadcast_to(np.arange(n) - firsts[..., np.newaxis],
+                              positions.shape)
+    return np.where(indices >= 0, np.take_along_axis(
+        positions, np.maximum(indices, 0), -1), 0)
+
+
+def forward_fill(events):
+    '''nan表示没有信号，沿最后一个轴沿用上一个信号，一开始为0'''
+    indices = np.where(np.isnan(events), 0,
+                       np.arange(events.shape[-1]))
+    np.maximum.accumulate(indices, axis=-1, out=indices)
+    return np.nan_to_num(np.take_along_axis(events, indices, -1))
+
+
+def crossover_positions(fasts, slows):
+    '''快线在慢线之上做多，之下做空，任一为nan时空仓'''
+    with np.errstate(invalid='ignore'):
+        return np.nan_to_num(np.sign(fasts - slows))
+
+
+def band_positions(closing_prices, lowers, medios, uppers,
+                   breakout=False):
+    '''
+    均值回归(默认)：跌破下轨做多，涨破上轨做空，回到中轨平仓；
+    breakout为True时顺势：涨破上轨做多，跌破下轨做空，回到中轨平仓
+    '''
+    with np.errstate(invalid='ignore'):
+        below, above = closing_prices < lowers, \
+            closing_prices > uppers
+        under, over = closing_prices <= medios, \
+            closing_prices >= medios
+    if breakout:
+        below, above, under, over = above, below, over, under
+    longs = forward_fill(np.where(below, 1.0, np.where(
+        over, 0.0, np.nan)))
+    shorts = forward_fill(np.where(above, 1.0, np.where(
+        under, 0.0, np.nan)))
+    return longs - shorts
+
+
+def prediction_positions(closing_prices, predictions):
+    '''预测下一天上涨做多，下跌做空'''
+    with np.errstate(invalid='ignore'):
+        return np.nan_to_num(np.sign(predictions - closing_prices))
+
+
+# 策略：(最高价, 最低价, 收盘价)和参数组列表 -> 仓位
+# 同一批参数共用的中间结果只算一次
+
+def sma_strategy(prices, params):
+    '''params为(快线N, 慢线N)'''
+    Ns = sorted({N for pair in params for N in pair})
+    smas = dict(zip(Ns, sweep_sma(Ns, prices[2])))
+    return np.stack([crossover_positions(smas[fast], smas[slow])
+                     for fast, slow in params])
+
+
+def sbb_strategy(prices, params):
+    '''params为(N,)，布林带宽度为两倍标准差'''
+    Ns = [N for N, in params]
+    sbb_medios, sbb_lowers, sbb_uppers = sweep_sbb(Ns, prices[2])
+    return np.stack([band_positions(
+        prices[2], sbb_lowers[k], sbb_medios[k], sbb_uppers[k])
+        for k in range(len(Ns))])
+
+
+def pivot_strategy(prices, params):
+    '''params为(breakout,)，价位由前一天的高低收算出'''
+    levels = calc_levels(*prices)
+    return np.stack([band_positions(prices[2], *levels, breakout)
+                     for breakout, in params])
+
+
+def predict_strategy(prices, params):
+    '''params为(N,)'''
+    predictions = sweep_predict([N for N, in params], prices[2])
+    return prediction_positions(prices[2], predictions)
+
+
+# 策略名 -> (策略函数, 默认参数网格)
+g_strategies = {
+    'sma': (sma_strategy, [(fast, slow) for fast in (5, 10, 20)
+                           for slow in (20, 50, 100, 200)
+                           if fast < slow]),
+    'sbb': (sbb_strategy, [(N,) for N in (10, 20, 50)]),
+    'pivot': (pivot_strategy, [(False,), (True,)]),
+    'predict': (predict_strategy, [(N,) for N in (3, 5, 10)]),
+}
+
+
+def calc_returns(closing_prices):
+    '''第t天的涨跌幅，第0天和没有数据的品种为0'''
+    returns = np.zeros(np.shape(closing_prices))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns[..., 1:] = closing_prices[..., 1:] / \
+            closing_prices[..., :-1] - 1
+    return np.nan_to_num(returns, posinf=0, neginf=0)
+
+
+def calc_pnls(positions, returns, cost=0.0):
+    '''返回(每天的收益, 每天的换手)，调仓当天按换手扣除cost'''
+    trades = np.abs(np.diff(positions, axis=-1, prepend=0))
+    pnls = np.zeros(np.broadcast_shapes(positions.shape,
+                                        returns.shape))
+    pnls[..., 1:] = positions[..., :-1] * returns[..., 1:]
+    return pnls - cost * trades, trades
+
+
+def calc_metrics(positions, pnls, trades, listed=None):
+    '''
+    各项指标的字典，每项的形状为positions.shape[:-1]，
+    listed为False的天(上市前)不计入夏普比率和换手率的天数
+    '''
+    if listed is None:
+        listed = np.ones(pnls.shape[-1], dtype=bool)
+    days = listed.sum(axis=-1)
+    equity = np.cumprod(1 + pnls, axis=-1)
+    drawdowns = 1 - equity / np.maximum.accumulate(equity, axis=-1)
+    # 持仓过夜的天数和其中赚钱的天数
+    held = positions[..., :-1] != 0
+    wins = (held & (pnls[..., 1:] > 0)).sum(axis=-1)
+    bets = held.sum(axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = pnls.sum(axis=-1) / days
+        deviations = np.where(listed, pnls - means[..., np.newaxis],
+                              0)
+        stds = np.sqrt((deviations * deviations).sum(axis=-1) / days)
+        return {
+            'total_return': equity[..., -1] - 1,
+            'sharpe': means / stds * np.sqrt(TRADING_DAYS),
+            'max_drawdown': drawdowns.max(axis=-1),
+            'turnover': trades.sum(axis=-1) / days,
+            'hit_rate': wins / bets,
+        }
+
+
+def run_strategy(prices, strategy, params):
+    '''
+    返回(仓位, 涨跌幅, 是否已上市)，
+    各品种的数据先左移到从上市当天开始，指标只用真实存在的Ｋ线，
+    算出的仓位再移回原来的天，上市前空仓
+    '''
+    prices = tuple(fill_gaps(values) for values in prices)
+    firsts = listing_days(prices[2])
+    positions = shift_right(g_strategies[strategy][0](tuple(
+        shift_left(values, firsts) for values in prices), params),
+        firsts)
+    listed = np.arange(prices[2].shape[-1]) >= \
+        firsts[..., np.newaxis]
+    return positions, calc_returns(prices[2]), listed
+
+
+def backtest(prices, strategy, params, cost=0.0):
+    '''prices为(最高价, 最低价, 收盘价)，返回(参数组数, 品种数)的指标'''
+    positions, returns, listed = run_strategy(prices, strategy, params)
+    return calc_metrics(positions, *calc_pnls(
+        positions, returns, cost), listed)
+
+
+g_prices = None
+
+
+def init_worker(prices):
+    global g_prices
+    g_prices = prices
+
+
+def run_params(task):
+    strategy, params, cost = task
+    return backtest(g_prices, strategy, params, cost)
+
+
+def sweep(prices, strategy, params, processes=None, chunk=8,
+          cost=0.0):
+    '''参数网格每chunk组交给一个进程，结果按参数的顺序拼接'''
+    tasks = [(strategy, params[i:i + chunk], cost)
+             for i in range(0, len(params), chunk)]
+    with mpc.Pool(processes, initializer=init_worker,
+                  initargs=(prices,)) as pool:
+        results = pool.map(run_params, tasks)
+    return {key: np.concatenate([result[key] for result in results])
+            for key in results[0]}
+
+
+def walk_forward(prices, strategy, params, train, test, cost=0.0,
+                 metric='sharpe'):
+    '''
+    训练窗口[start, start + train)上每个品种选metric最大的参数，
+    在测试窗口[start + train, start + train + test)上交易，
+    窗口每次前移test天；指标只用到当天及以前的数据，
+    所以仓位在全部历史上一次算出，各窗口只取切片
+    返回(每个窗口选中的参数下标(窗口数, 品种数), 样本外的指标)
+    '''
+    positions, returns, listed = run_strategy(prices, strategy, params)
+    pnls, trades = calc_pnls(positions, returns, cost)
+    choices, samples = [], []
+    for start in range(0, positions.shape[-1] - train - test + 1,
+                       test):
+        fit = slice(start, start + train)
+        scores = calc_metrics(positions[..., fit], pnls[..., fit],
+                              trades[..., fit],
+                              listed[..., fit])[metric]
+        best = np.argmax(np.where(np.isnan(scores), -np.inf, scores),
+                         axis=0)
+        choices.append(best)
+        trade = slice(start + train, start + train + test)
+        samples.append([np.take_along_axis(
+            values[..., trade], best[np.newaxis, :, np.newaxis],
+            axis=0)[0] for values in (positions, pnls, trades)] +
+            [listed[..., trade]])
+    if not choices:
+        return np.empty((0, positions.shape[1]), dtype=np.intp), None
+    return np.array(choices), calc_metrics(*(
+        np.concatenate(values, axis=-1) for values in zip(*samples)))
+
+
+def print_metrics(label, metrics):
+    # 各品种取平均
+    values = tuple(np.nanmean(metrics[key]) * scale
+                   for key, scale in (
+                       ('total_return', 100), ('sharpe', 1),
+                       ('max_drawdown', 100), ('turnover', 1),
+                       ('hit_rate', 100)))
+    print('%-16s %8.2f%% %8.2f %8.2f%% %8.3f %8.2f%%' % (
+        (label,) + values))
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-s', '--strategy', default='sma',
+                        choices=sorted(g_strategies))
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('-c', '--cost', type=float, default=0.0)
+    parser.add_argument('--train', type=int, default=None)
+    parser.add_argument('--test', type=int, default=None)
+    parser.add_argument('sources', nargs='+')
+    args = parser.parse_args(argv[1:])
+    prices = load(args.sources)
+    prices = tuple(np.asarray(field) for field in (
+        prices.highest_prices, prices.lowest_prices,
+        prices.closing_prices))
+    params = g_strategies[args.strategy][1]
+    metrics = sweep(prices, args.strategy, params, args.jobs,
+                    cost=args.cost)
+    print('%-16s %9s %8s %9s %8s %9s' % (
+        'PARAMS', 'RETURN', 'SHARPE', 'MAXDD', 'TURNOVER', 'HITRATE'))
+    for i, param in enumerate(params):
+        print_metrics(','.join(map(str, param)), {
+            key: values[i] for key, values in metrics.items()})
+    if args.train:
+        choices, samples = walk_forward(
+            prices, args.strategy, params, args.train,
+            args.test or args.train // 5, args.cost)
+        if samples is None:
+            print('not enough days for walk-forward', file=sys.stderr)
+            return 1
+        print_metrics('walk-forward', samples)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
@@ -0,0 +1,67 @@
+# 固定容量的Ｋ线环形缓冲区，一个预先分配的结构化数组保存
+# (date, opening, highest, lowest, closing, volume)
+# 数组长度为容量的两倍，每根Ｋ线同时写在i和i + capacity两个位置，
+# 所以最近的Ｋ线在数组里总是连续的一段，取视图不需要复制；
+# 追加为O(1)，超出容量时最早的Ｋ线被覆盖，内存不会增长
+
+import numpy as np
+import loader
+
+
+g_bar_dtype = np.dtype([
+    ('date', 'M8[D]'), ('opening', 'f8'), ('highest', 'f8'),
+    ('lowest', 'f8'), ('closing', 'f8'), ('volume', 'f8')])
+
+
+class BarStore:
+    __slots__ = ('capacity', 'bars', 'start', 'size')
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.bars = np.zeros(capacity * 2, dtype=g_bar_dtype)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, bar):
+        '''bar与loader.read_data的一行格式相同'''
+        end = (self.start + self.size) % self.capacity
+        self.bars[end] = self.bars[end + self.capacity] = tuple(bar)
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+        return self
+
+    def extend(self, dates, opening_prices, highest_prices,
+               lowest_prices, closing_prices, volumes):
+        '''批量追加，参数与loader.read_data的返回值相同'''
+        count = min(len(dates), self.capacity)
+        rows = np.empty(count, dtype=g_bar_dtype)
+        for name, values in zip(g_bar_dtype.names, (
+                dates, opening_prices, highest_prices,
+                lowest_prices, closing_prices, volumes)):
+            rows[name] = values[len(values) - count:]
+        positions = (self.start + self.size +
+                     np.arange(count)) % self.capacity
+        self.bars[positions] = self.bars[
+            positions + self.capacity] = rows
+        overflow = max(self.size + count - self.capacity, 0)
+        self.start = (self.start + overflow) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        return self
+
+    def view(self):
+        '''最近size根Ｋ线，按时间顺序，不复制'''
+        return self.bars[self.start:self.start + self.size]
+
+    def columns(self):
+        '''与loader.read_data相同顺序的各列视图，可直接传给指标函数'''
+        bars = self.view()
+        return tuple(bars[name] for name in g_bar_dtype.names)
+
+
+def load_bars(filename, capacity):
+    return BarStore(capacity).extend(*loader.read_data(filename))
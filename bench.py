@@ -0,0 +1,246 @@
+# 性能基准：按输入文件的格式SYMBOL,DD-MM-YYYY, ,O,H,L,C,V
+# 生成指定根数、指定只数的随机Ｋ线，测量读取、各指标函数和
+# 各画图函数(Agg后端，不弹窗口)的耗时、吞吐量和峰值内存，
+# 每项结果作为一行json追加到输出文件，便于比较不同版本
+# 用法：python bench.py [-b 1000 100000] [-s 1 100] [-r 3] \
+#           [-o bench.jsonl] [--no-draw]
+# 某一项出错时记录error字段，继续测量其余各项
+# 10M根Ｋ线时日期超出4位年份的范围，多根Ｋ线共用一个日期，
+# 相当于日内Ｋ线
+
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import subprocess
+import numpy as np
+import loader
+import resample
+import groupby
+import indicators
+
+
+g_bars = (1000, 100000, 10000000)
+g_symbols = (1, 100, 5000)
+g_charts = ('cs', 'sma', 'sbb', 'trendline', 'linearmodel', 'poly')
+FIRST_DAY = np.datetime64('1900-01-01')
+LAST_DAY = np.datetime64('2099-12-31')
+
+
+def make_ohlcv(bars, symbols, seed=0):
+    '''几何随机游走，返回dates和(symbols, bars)的开高低收量'''
+    rng = np.random.default_rng(seed)
+    days = np.busday_count(FIRST_DAY, LAST_DAY)
+    dates = np.busday_offset(
+        FIRST_DAY, np.arange(bars) * min(days, bars) // bars)
+    closing_prices = 50 * np.exp(np.cumsum(
+        rng.normal(0, 0.01, (symbols, bars)), axis=1))
+    opening_prices = closing_prices * np.exp(
+        rng.normal(0, 0.005, (symbols, bars)))
+    spreads = np.abs(rng.normal(0, 0.005, (2, symbols, bars)))
+    highest_prices = np.maximum(
+        opening_prices, closing_prices) * (1 + spreads[0])
+    lowest_prices = np.minimum(
+        opening_prices, closing_prices) * (1 - spreads[1])
+    volumes = rng.integers(1e5, 1e7, (symbols, bars)).astype('f8')
+    return dates, opening_prices, highest_prices, \
+        lowest_prices, closing_prices, volumes
+
+
+def write_csv(filename, symbol, dates, opening_prices,
+              highest_prices, lowest_prices, closing_prices,
+              volumes):
+    dmys = loader.days2dmy(dates)
+    columns = [np.char.mod('%.2f', prices) for prices in (
+        opening_prices, highest_prices, lowest_prices,
+        closing_prices)]
+    rows = np.char.add(symbol + ',', dmys)
+    rows = np.char.add(rows, ', ')
+    for column in columns:
+        rows = np.char.add(np.char.add(rows, ','), column)
+    rows = np.char.add(np.char.add(rows, ','),
+                       np.char.mod('%d', volumes))
+    with open(filename, 'w') as file:
+        file.write('\n'.join(rows.tolist()))
+        file.write('\n')
+
+
+def make_files(directory, bars, symbols):
+    '''生成的文件按尺寸缓存在directory下，已存在则直接复用'''
+    directory = os.path.join(directory, '%d_%d' % (bars, symbols))
+    os.makedirs(directory, exist_ok=True)
+    filenames = [os.path.join(directory, 'S%05d.csv' % i)
+                 for i in range(symbols)]
+    missing = [i for i, filename in enumerate(filenames)
+               if not os.path.exists(filename)]
+    for i in missing:
+        dates, *columns = make_ohlcv(bars, 1, seed=i)
+        write_csv(filenames[i] + '.tmp', 'S%05d' % i, dates,
+                  *(column[0] for column in columns))
+        os.replace(filenames[i] + '.tmp', filenames[i])
+    return filenames
+
+
+def measure(func, repeat):
+    '''返回最短耗时(秒)和峰值内存(字节)'''
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak
+
+
+def calc_cases(dates, opening_prices, highest_prices,
+               lowest_prices, closing_prices, volumes):
+    tr = indicators.true_range(
+        highest_prices, lowest_prices, closing_prices)
+    days = dates.astype(np.int64).astype('f8')
+    return {
+        'calc_sma': lambda: indicators.calc_sma(
+            20, closing_prices),
+        'calc_smas': lambda: indicators.calc_smas(
+            (5, 10, 15), closing_prices),
+        'calc_sbb': lambda: indicators.calc_sbb(
+            20, closing_prices),
+        'sweep_sma': lambda: indicators.sweep_sma(
+            range(5, 55, 5), closing_prices),
+        'sweep_sbb': lambda: indicators.sweep_sbb(
+            range(5, 55, 5), closing_prices),
+        'sweep_predict': lambda: indicators.sweep_predict(
+            range(2, 12, 2), closing_prices),
+        'true_range': lambda: indicators.true_range(
+            highest_prices, lowest_prices, closing_prices),
+        'average_true_range': lambda: indicators.average_true_range(
+            tr, 14),
+        'predict_prices': lambda: indicators.predict_prices(
+            5, closing_prices),
+        'calc_pivots': lambda: indicators.calc_pivots(
+            highest_prices, lowest_prices, closing_prices),
+        'fit_lines': lambda: indicators.fit_lines(
+            days, closing_prices, days),
+        'fit_polys': lambda: indicators.fit_polys(
+            days, closing_prices, 5, days),
+        'find_peeks': lambda: indicators.find_peeks(
+            days, closing_prices, 5, days[0], days[-1]),
+        'find_rolling_peeks':
+            lambda: indicators.find_rolling_peeks(
+                days, closing_prices, 5, 20),
+        'resample_ohlcv': lambda: resample.resample_ohlcv(
+            'W', dates, opening_prices, highest_prices,
+            lowest_prices, closing_prices, volumes),
+        'group_stats': lambda: groupby.group_prices(
+            'weekday', dates, closing_prices),
+    }
+
+
+def draw_case(chart, filenames):
+    import importlib
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as mp
+    module = importlib.import_module(chart)
+    sources = filenames[:2] if chart == 'poly' else filenames[:1]
+    if len(sources) < (2 if chart == 'poly' else 1):
+        sources = sources * 2
+
+    def draw():
+        figure = mp.figure(figsize=(19.2, 10.8))
+        try:
+            module.plot_chart(*sources)
+            figure.savefig(io.BytesIO(), format='png')
+        finally:
+            mp.close(figure)
+    return draw
+
+
+def version():
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            universal_newlines=True).stdout.strip() or 'unknown'
+    except OSError:
+        return 'unknown'
+
+
+def run(bars, symbols, repeat, directory, draw, output):
+    common = {'version': version(),
+              'python': platform.python_version(),
+              'numpy': np.__version__, 'bars': bars,
+              'symbols': symbols, 'time': time.strftime(
+                  '%Y-%m-%dT%H:%M:%S')}
+
+    def record(name, func):
+        try:
+            seconds, peak = measure(func, repeat)
+        except Exception as exception:
+            result = dict(common, name=name, error='%s: %s' % (
+                type(exception).__name__, exception))
+            print(json.dumps(result), file=output, flush=True)
+            print('%-20s %8d x %-5d %s' % (
+                name, bars, symbols, result['error']),
+                file=sys.stderr)
+            return
+        result = dict(common, name=name, seconds=seconds,
+                      bars_per_second=bars * symbols / seconds,
+                      peak_bytes=peak)
+        print(json.dumps(result), file=output, flush=True)
+        print('%-20s %8d x %-5d %10.4f s %12.0f bars/s %8.1f MB' % (
+            name, bars, symbols, seconds, result['bars_per_second'],
+            peak / 2 ** 20), file=sys.stderr)
+
+    filenames = make_files(directory, bars, symbols)
+    cache_dir = os.path.join(directory, 'cache')
+
+    def parse():
+        for filename in filenames:
+            loader.read_data(filename, None)
+
+    def load_cached():
+        for filename in filenames:
+            loader.read_data(filename, cache_dir)
+    record('read_data', parse)
+    load_cached()
+    record('read_data_cached', load_cached)
+    columns = make_ohlcv(bars, symbols)
+    for name, func in calc_cases(*columns).items():
+        record(name, func)
+    if draw:
+        for chart in g_charts:
+            record('draw_' + chart, draw_case(chart, filenames))
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-b', '--bars', type=int, nargs='+',
+                        default=g_bars[:1])
+    parser.add_argument('-s', '--symbols', type=int, nargs='+',
+                        default=g_symbols[:1])
+    parser.add_argument('-r', '--repeat', type=int, default=3)
+    parser.add_argument('-o', '--output', default='bench.jsonl')
+    parser.add_argument('-d', '--directory', default='.bench_data')
+    parser.add_argument('--no-draw', dest='draw',
+                        action='store_false')
+    args = parser.parse_args(argv[1:])
+    with open(args.output, 'a') as output:
+        for bars in args.bars:
+            for symbols in args.symbols:
+                run(bars, symbols, args.repeat, args.directory,
+                    args.draw, output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
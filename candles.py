@@ -0,0 +1,36 @@
+# 用两个集合画Ｋ线：LineCollection画影线，PolyCollection画实体，
+# 不论多少根Ｋ线都只有两个artist，代替两次mp.bar(每根一个Rectangle)
+
+import numpy as np
+import lazy
+
+
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
+mc = lazy.lazy_import('matplotlib.collections')
+
+
+def draw_candles(dates, opening_prices, highest_prices,
+                 lowest_prices, closing_prices, fc, ec,
+                 width=0.8):
+    '''fc、ec为每根Ｋ线的填充色和边缘色，width单位为天'''
+    ax = mp.gca()
+    # 与mp.bar一样以日期为x轴
+    ax.xaxis_date()
+    x = md.date2num(dates)
+    # 影线：(n, 2, 2)，每根一条从最低价到最高价的竖线
+    wicks = np.stack((
+        np.column_stack((x, lowest_prices)),
+        np.column_stack((x, highest_prices))), axis=1)
+    # 实体：(n, 4, 2)，每根一个开盘价到收盘价的矩形
+    left, right = x - width / 2, x + width / 2
+    bodies = np.stack((
+        np.column_stack((left, opening_prices)),
+        np.column_stack((right, opening_prices)),
+        np.column_stack((right, closing_prices)),
+        np.column_stack((left, closing_prices))), axis=1)
+    ax.add_collection(mc.LineCollection(
+        wicks, colors=ec, linewidths=1))
+    ax.add_collection(mc.PolyCollection(
+        bodies, facecolors=fc, edgecolors=ec, linewidths=1))
+    ax.autoscale_view()
@@ -0,0 +1,227 @@
+# 超出内存的历史数据分块处理：按固定行数分块读取csv
+# (或ingest.py保存的面板目录里的一只股票)，
+# 滑动均线、布林带和ATR的状态跨块延续，结果逐块追加写到输出文件，
+# 内存占用只取决于块的大小，与文件大小无关
+# 各状态与批量函数的运算顺序完全一致，输出与一次读入全部数据逐位相同：
+# 均线延续rolling的平移补偿前缀和(平移量是整个序列的第一个值)，
+# 只保留最近N个前缀和；标准差按rolling.rolling_variances的N块计算，
+# 保留从块边界开始的最多2N - 1个收盘价；ATR按smoothing.BLOCK分块平滑，
+# 不足一块的真实波幅留到下一块凑满再算，最后一块在结束时算
+# 输出每行为：日期,收盘价,均线,布林带下轨,布林带上轨,ATR，数值为%.17g
+# 用法：python chunked.py [-n 20] [-a 14] [-c 100000] [-o out.csv] \
+#           (aapl.csv | store SYMBOL)
+
+import os
+import sys
+import argparse
+import itertools
+import numpy as np
+import loader
+import panel
+import rolling
+import smoothing
+import instrument
+from indicators import true_range
+
+
+CHUNK = 100000
+
+
+def iter_csv(filename, size=CHUNK):
+    '''每次解析size行，产生与loader.read_data相同的6列'''
+    with open(filename) as file:
+        while True:
+            lines = list(itertools.islice(file, size))
+            if not lines:
+                break
+            instrument.count('bytes_read', sum(map(len, lines)))
+            yield loader.parse_lines(lines)
+
+
+def iter_store(directory, symbol, size=CHUNK):
+    '''内存映射的面板每次只读一只股票的size天，去掉没有数据的天'''
+    prices = panel.open_panel(directory)
+    row = prices.index(symbol)
+    for start in range(0, prices.dates.size, size):
+        columns = (np.asarray(prices.dates[start:start + size]),) + \
+            tuple(np.asarray(field[row, start:start + size])
+                  for field in prices.fields())
+        valid = ~np.isnan(columns[4])
+        yield tuple(column[valid] for column in columns)
+
+
+def extend_sums(c, addends):
+    '''把addends接着累加到c = (前缀和, 修正项)的末尾'''
+    sums, corrections = rolling.compensated_cumsum(
+        np.concatenate((c[0][-1:], addends)), c[1][-1])
+    return np.concatenate((c[0][:-1], sums)), \
+        np.concatenate((c[1][:-1], corrections))
+
+
+class MomentsState:
+    '''与rolling.rolling_moments(a, (N,))逐位相同的分块版本'''
+    __slots__ = ('N', 'shift', 'c1', 'seen', 'tail')
+
+    def __init__(self, N):
+        self.N = N
+        self.shift = None
+        self.c1 = (np.zeros(1), np.zeros(1))
+        # 已经读入的个数和从块边界开始的最近几个值
+        self.seen = 0
+        self.tail = np.empty(0)
+
+    def update(self, values):
+        '''返回与values等长的(均值, 标准差)，窗口不满时为nan'''
+        if values.size == 0:
+            # 面板里上市前的天都去掉了，可能得到空块
+            return np.empty(0), np.empty(0)
+        if self.shift is None:
+            self.shift = values[:1]
+        c1 = extend_sums(self.c1, values - self.shift)
+        # 下一块的第j个窗口和要用到它之前的N个前缀和
+        self.c1 = tuple(c[-self.N:] for c in c1)
+        tail = np.concatenate((self.tail, values))
+        self.seen += values.size
+        means = np.full(values.size, np.nan)
+        stds = np.full(values.size, np.nan)
+        count = c1[0].size - self.N
+        if count > 0:
+            means[-count:] = rolling.means_from_sums(
+                self.N, self.shift, c1)
+            stds[-count:] = np.sqrt(rolling.rolling_variances(
+                tail, self.N)[-count:])
+        # 下一个窗口从第seen - N + 1个值开始，从它所在的块开头保留
+        start = max(self.seen - self.N + 1, 0) // self.N * self.N
+        self.tail = tail[tail.size - (self.seen - start):]
+        return means, stds
+
+
+class ATRState:
+    '''
+    与average_true_range(true_range(...), N)逐位相同的分块版本，
+    update返回新算出的ATR，个数与输入不一定相同，finish返回剩下的
+    '''
+    __slots__ = ('N', 'prev_closing_price', 'seeds', 'prev',
+                 'pending')
+
+    def __init__(self, N=14):
+        self.N = N
+        self.prev_closing_price = None
+        self.seeds = np.empty(0)
+        self.prev = None
+        self.pending = np.empty(0)
+
+    def update(self, highest_prices, lowest_prices, closing_prices):
+        if closing_prices.size == 0:
+            return np.empty(0)
+        if self.prev_closing_price is None:
+            # 第一天没有真实波幅，按Ｋ线对齐时补一个nan
+            outputs = [np.full(1, np.nan)]
+            trs = true_range(highest_prices, lowest_prices,
+                             closing_prices)
+        else:
+            outputs = []
+            trs = true_range(*(np.concatenate(([first], values))
+                               for first, values in (
+                (np.nan, highest_prices), (np.nan, lowest_prices),
+                (self.prev_closing_price, closing_prices))))
+        self.prev_closing_price = closing_prices[-1]
+        if self.prev is None:
+            count = min(self.N - self.seeds.size, trs.size)
+            self.seeds = np.concatenate((self.seeds, trs[:count]))
+            trs = trs[count:]
+            nans = np.full(count, np.nan)
+            if self.seeds.size == self.N:
+                self.prev = nans[-1] = self.seeds.mean()
+            outputs.append(nans)
+        if self.prev is not None:
+            self.pending = np.concatenate((self.pending, trs))
+            outputs.append(self.flush(
+                self.pending.size // smoothing.BLOCK *
+                smoothing.BLOCK))
+        return np.concatenate(outputs)
+
+    def flush(self, count):
+        if count == 0:
+            return np.empty(0)
+        atrs = smoothing.linear_filter(
+            self.pending[:count], 1 - 1 / self.N, self.prev)
+        self.prev = atrs[-1]
+        self.pending = self.pending[count:]
+        return atrs
+
+    def finish(self):
+        if self.prev is None:
+            return np.empty(0)
+        return self.flush(self.pending.size)
+
+
+def write_rows(file, dates, *columns):
+    rows = loader.days2dmy(dates)
+    for column in columns:
+        rows = np.char.add(np.char.add(rows, ','),
+                           np.char.mod('%.17g', column))
+    if rows.size:
+        file.write('\n'.join(rows.tolist()) + '\n')
+
+
+def process(chunks, file, N=20, atr_N=14):
+    '''
+    逐块计算并写出，还没有ATR的行暂存起来，最多BLOCK行，
+    返回写出的行数
+    '''
+    moments = MomentsState(N)
+    atr = ATRState(atr_N)
+    rows = [np.empty(0, dtype='M8[D]')] + [np.empty(0)] * 4
+    atrs = np.empty(0)
+    total = 0
+    for dates, _, highest_prices, lowest_prices, closing_prices, \
+            _ in chunks:
+        with instrument.stage('compute'):
+            means, stds = moments.update(closing_prices)
+            double_stds = stds * 2
+            rows = [np.concatenate(pair) for pair in zip(rows, (
+                dates, closing_prices, means, means - double_stds,
+                means + double_stds))]
+            atrs = np.concatenate((atrs, atr.update(
+                highest_prices, lowest_prices, closing_prices)))
+        with instrument.stage('save'):
+            write_rows(file, *(row[:atrs.size] for row in rows),
+                       atrs)
+        total += atrs.size
+        rows = [row[atrs.size:] for row in rows]
+        atrs = atrs[atrs.size:]
+    # 剩下的行正好是凑不满一块的真实波幅
+    atrs = atr.finish()
+    write_rows(file, *rows, atrs)
+    return total + atrs.size
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-n', '--window', type=int, default=20)
+    parser.add_argument('-a', '--atr', type=int, default=14)
+    parser.add_argument('-c', '--chunk', type=int, default=CHUNK)
+    parser.add_argument('-o', '--output', default='-')
+    parser.add_argument('source')
+    parser.add_argument('symbol', nargs='?')
+    args = parser.parse_args(argv[1:])
+    instrument.configure(envp)
+    if os.path.isdir(args.source):
+        if args.symbol is None:
+            parser.error('a store needs a symbol')
+        chunks = iter_store(args.source, args.symbol, args.chunk)
+    else:
+        chunks = iter_csv(args.source, args.chunk)
+    with instrument.stage('chunked', file=args.source):
+        if args.output == '-':
+            count = process(chunks, sys.stdout, args.window, args.atr)
+        else:
+            with open(args.output, 'w') as file:
+                count = process(chunks, file, args.window, args.atr)
+    print('%d rows' % count, file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
@@ -7,32 +7,27 @@ import os
 import sys
 import platform
 # python在linux和windows全屏显示图例的方法不一样，所以需要导入platform
-import datetime as dt
 import numpy as np
-import matplotlib.pyplot as mp
-import matplotlib.dates as md
+import loader
+import candles
+import lod
+import instrument
+import lazy
 
 
-def dmy2ymd(dmy):
-	# 将'日－月－年'格式的日期转换为numpy能够识别的'年-月-日'
-	# 如果在linux系统下则默认'utf-8'格式
-    return dt.datetime.strptime(
-        str(dmy, encoding='utf-8'),
-        '%d-%m-%Y').date().strftime('%Y-%m-%d')
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
 
 
 def read_data(filename):
     dates, opening_prices, highest_prices, \
-        lowest_prices, closing_prices = np.loadtxt(
-            filename, delimiter=',',
-            usecols=(1, 3, 4, 5, 6), unpack=True,
-            dtype=np.dtype('M8[D], f8, f8, f8, f8'),
-            converters={1: dmy2ymd})
+        lowest_prices, closing_prices, _ = loader.read_data(
+            filename)
     return dates, opening_prices, highest_prices, \
         lowest_prices, closing_prices
 
 
-def init_chart(first_day, last_day):
+def init_chart(first_day, last_day, unit='D'):
 	# 设置背景色
     mp.gcf().set_facecolor(np.ones(3) * 240 / 255)
     mp.title('Candlestick Chart', fontsize=20)
@@ -44,16 +39,8 @@ def init_chart(first_day, last_day):
             '%d %b %Y')), fontsize=14)
     mp.ylabel('Stock Price (USD) Of Apple Inc.',
               fontsize=14)
-    # 获得xy轴
-    ax = mp.gca()
-    # 设置星期一为x轴主刻度
-    ax.xaxis.set_major_locator(
-        md.WeekdayLocator(byweekday=md.MO))
-    # 设置日期为次定位器
-    ax.xaxis.set_minor_locator(md.DayLocator())
-    # 设置以什么样的格式来显示这些刻度
-    ax.xaxis.set_major_formatter(
-        md.DateFormatter('%d %b %Y'))
+    # 按Ｋ线的周期设置x轴的主次刻度和刻度格式
+    lod.set_locators(mp.gca(), unit)
     # 以下代码基本初始化通用
     mp.tick_params(which='both', top=True, right=True,
                    labelright=True, labelsize=10)
@@ -61,9 +48,7 @@ def init_chart(first_day, last_day):
 
 
 def draw_chart(dates, opening_prices, highest_prices,
-               lowest_prices, closing_prices):
-	# 转换日期格式为mp可以识别的格式
-    dates = dates.astype(md.datetime.datetime)
+               lowest_prices, closing_prices, width=0.8):
     # 1e-2表示一美分
     up = closing_prices - opening_prices >= 1e-2
     down = opening_prices - closing_prices >= 1e-2
@@ -72,14 +57,10 @@ def draw_chart(dates, opening_prices, highest_prices,
     ec = np.zeros(dates.size, dtype='3f4')
     fc[up], fc[down] = (1, 1, 1), (0, 0.5, 0)
     ec[up], ec[down] = (1, 0, 0), (0, 0.5, 0)
-    # mp.bar参数说明（对应ｘ每个刻度为坐标，宽度取绝对值，长度，
-    # 底部，对其方式，填充色，边缘色）
-    mp.bar(dates, highest_prices - lowest_prices, 0,
-           lowest_prices, align='center', color=fc,
-           edgecolor=ec)
-    mp.bar(dates, closing_prices - opening_prices, 0.8,
-           opening_prices, align='center', color=fc,
-           edgecolor=ec)
+    # 影线和实体各用一个集合画出
+    candles.draw_candles(dates, opening_prices, highest_prices,
+                         lowest_prices, closing_prices, fc, ec,
+                         width)
     # 主刻度label斜体显示
     mp.gcf().autofmt_xdate()
 
@@ -93,14 +74,27 @@ def show_chart():
     mp.show()
 
 
+def plot_chart(filename):
+    with instrument.stage('load', file=filename):
+        dates, opening_prices, highest_prices, \
+            lowest_prices, closing_prices = read_data(filename)
+    with instrument.stage('compute', file=filename):
+        # Ｋ线太多时合并成周线、月线
+        unit = lod.choose_unit(dates)
+        bars = lod.resample_ohlc(
+            unit, dates, opening_prices, highest_prices,
+            lowest_prices, closing_prices)
+    with instrument.stage('draw', file=filename):
+        init_chart(dates[0], dates[-1], unit)
+        draw_chart(*bars, lod.candle_width(unit))
+
+
 def main(argc, argv, envp):
-    dates, opening_prices, highest_prices, \
-        lowest_prices, closing_prices = read_data(
-            'aapl.csv')
-    init_chart(dates[0], dates[-1])
-    draw_chart(dates, opening_prices, highest_prices,
-               lowest_prices, closing_prices)
-    show_chart()
+    instrument.configure(envp)
+    with instrument.stage('cs'):
+        plot_chart('aapl.csv')
+        with instrument.stage('show'):
+            show_chart()
     return 0
 
 
@@ -0,0 +1,72 @@
+# 按星期、月份、年内周数、月内日期分组统计收盘价和收益率
+# 分组统计用np.bincount/ufunc.at完成，不再对每个分组扫描一遍数组
+# values可以是(品种数, 天数)的二维数组，结果为(品种数, 分组数)，
+# nan不参与统计，没有数据的分组结果为nan(count为0)
+
+import numpy as np
+import loader
+
+
+g_groups = {'weekday': 7, 'month': 12, 'week': 53, 'day': 31}
+
+
+def group_keys(by, dates):
+    '''返回从0开始的分组编号'''
+    dates = dates.astype('M8[D]')
+    if by == 'weekday':
+        return loader.dates2weekdays(dates)
+    if by == 'month':
+        return dates.astype('M8[M]').astype(np.int64) % 12
+    if by == 'week':
+        return (dates - dates.astype('M8[Y]')).astype(np.int64) // 7
+    if by == 'day':
+        return (dates - dates.astype('M8[M]')).astype(np.int64)
+    raise ValueError('unknown group: %s' % by)
+
+
+def calc_returns(closing_prices):
+    '''收益率，第一天为nan，沿最后一个轴计算'''
+    closing_prices = np.asarray(closing_prices, dtype='f8')
+    returns = np.full_like(closing_prices, np.nan)
+    returns[..., 1:] = closing_prices[..., 1:] / \
+        closing_prices[..., :-1] - 1
+    return returns
+
+
+def group_stats(keys, groups, values):
+    '''返回count、mean、std、min、max组成的字典'''
+    values = np.asarray(values, dtype='f8')
+    shape = values.shape[:-1] + (groups,)
+    # 每个品种的分组编号错开groups，所有品种一起统计
+    rows = np.arange(int(np.prod(values.shape[:-1])))
+    indices = (rows[:, np.newaxis] * groups + keys).reshape(-1)
+    values = values.reshape(-1)
+    valid = ~np.isnan(values)
+    indices, values = indices[valid], values[valid]
+    size = rows.size * groups
+    counts = np.bincount(indices, minlength=size)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        means = np.bincount(indices, values, size) / counts
+        # 离差平方和在第二遍里求，避免E[x²] - E[x]²的抵消误差
+        deviations = values - means[indices]
+        stds = np.sqrt(np.bincount(
+            indices, deviations * deviations, size) / counts)
+    mins = np.full(size, np.inf)
+    maxs = np.full(size, -np.inf)
+    np.minimum.at(mins, indices, values)
+    np.maximum.at(maxs, indices, values)
+    empty = counts == 0
+    mins[empty] = maxs[empty] = np.nan
+    return {'count': counts.reshape(shape),
+            'mean': means.reshape(shape),
+            'std': stds.reshape(shape),
+            'min': mins.reshape(shape),
+            'max': maxs.reshape(shape)}
+
+
+def group_prices(by, dates, closing_prices):
+    '''一次得到收盘价和收益率两张统计表'''
+    keys = group_keys(by, dates)
+    return group_stats(keys, g_groups[by], closing_prices), \
+        group_stats(keys, g_groups[by],
+                    calc_returns(closing_prices))
@@ -0,0 +1,54 @@
+# 测量各模块的导入时间(不含numpy本身)，检查只做计算时没有
+# 导入matplotlib和pandas，超出预算或导入了画图库时返回1
+# 用法：python importcheck.py [budget_ms] [module ...]
+
+import os
+import sys
+import subprocess
+
+
+# 每个模块在numpy之外允许的导入时间，单位毫秒
+BUDGET = 50
+g_modules = ('loader', 'rolling', 'smoothing', 'linefit',
+             'polyfit', 'indicators', 'resample', 'groupby',
+             'panel', 'streaming', 'barstore', 'tradingdays',
+             'instrument', 'screener', 'pairs', 'backtest',
+             'chunked', 'atr', 'summary', 'weekdays', 'cs', 'sma',
+             'sbb', 'poly', 'linearmodel', 'trendline')
+g_heavy = ('matplotlib', 'pandas')
+g_code = '''
+import sys
+import time
+import numpy
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(elapsed * 1000, *(name for name in %r if name in sys.modules))
+''' % (g_heavy,)
+
+
+def measure(module):
+    '''在新的解释器里导入module，返回(毫秒, 被导入的画图库)'''
+    output = subprocess.run(
+        [sys.executable, '-c', g_code, module],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.PIPE, check=True,
+        universal_newlines=True).stdout.split()
+    return float(output[0]), output[1:]
+
+
+def main(argc, argv, envp):
+    budget = float(argv[1]) if argc > 1 else BUDGET
+    modules = argv[2:] or g_modules
+    failed = False
+    for module in modules:
+        elapsed, heavy = measure(module)
+        ok = elapsed <= budget and not heavy
+        failed = failed or not ok
+        print('%-12s %8.1f ms %s %s' % (
+            module, elapsed, ' '.join(heavy), '' if ok else 'FAIL'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
@@ -0,0 +1,202 @@
+# 计算指标的函数集中在这里，只依赖numpy，不导入matplotlib，
+# 批处理和子进程只需要数值结果时导入本模块即可，启动更快
+# 各画图脚本从这里导入同名函数
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+import rolling
+import smoothing
+import linefit
+import polyfit
+
+
+def calc_sma(N, closing_prices):
+    '''由前缀和计算简单移动均线，复杂度O(n)'''
+    return rolling.rolling_mean(closing_prices, N)
+
+
+def calc_smas(Ns, closing_prices):
+    # 多个窗口长度共用一次前缀和
+    return rolling.rolling_means(closing_prices, Ns)
+
+
+def sweep_sma(Ns, closing_prices):
+    '''
+    参数寻优用：所有窗口长度共用一次前缀和，返回(len(Ns), ..., n)，
+    [k, ..., t]为截至第t天的Ns[k]日均线，不足一个窗口时为nan
+    '''
+    return rolling.sweep_means(closing_prices, Ns)
+
+
+def calc_sbb(N, closing_prices):
+    sbb_medios, stds = rolling.rolling_moments(
+        closing_prices, (N,))[0]
+    double_stds = stds * 2
+    sbb_lowers = sbb_medios - double_stds
+    sbb_uppers = sbb_medios + double_stds
+    return sbb_medios, sbb_lowers, sbb_uppers
+
+
+def sweep_sbb(Ns, closing_prices):
+    '''返回(中轨, 下轨, 上轨)，形状与sweep_sma相同'''
+    sbb_medios, stds = rolling.sweep_moments(closing_prices, Ns)
+    double_stds = stds * 2
+    return sbb_medios, sbb_medios - double_stds, \
+        sbb_medios + double_stds
+
+
+def true_range(highest_prices, lowest_prices,
+               closing_prices):
+    '''
+    真实波幅：当日最高、最低价和前一日收盘价所覆盖的区间
+    第一天没有前收盘价，结果比输入少一个，沿最后一个轴计算
+    '''
+    prev_closing_prices = closing_prices[..., :-1]
+    highs = np.maximum(highest_prices[..., 1:],
+                       prev_closing_prices)
+    lows = np.minimum(lowest_prices[..., 1:],
+                      prev_closing_prices)
+    return highs - lows
+
+
+def average_true_range(tr, N=14):
+    '''Wilder平滑，前N - 1个值为nan'''
+    return smoothing.wilder(tr, N)
+
+
+def fill_nans(closing_prices):
+    '''
+    一个nan就会让批量求伪逆的SVD不收敛，所有品种一起报错，
+    先把nan换成0，返回(换好的数组, rolling.nan_counts或None)，
+    再用mask_predictions把包含nan的窗口的预测值改回nan
+    '''
+    closing_prices = np.asarray(closing_prices, dtype='f8')
+    nans = np.isnan(closing_prices)
+    if not nans.any():
+        return closing_prices, None
+    return np.where(nans, 0, closing_prices), \
+        rolling.nan_counts(closing_prices)
+
+
+def mask_predictions(N, predictions, counts):
+    '''predictions[..., i]由窗口[i, i + 2N)算出'''
+    if counts is not None:
+        size = predictions.shape[-1]
+        predictions[counts[..., N * 2:N * 2 + size] -
+                    counts[..., :size] > 0] = np.nan
+    return predictions
+
+
+def predict_prices(N, closing_prices):
+    '''
+    需要２Ｎ个数预测一个数，第i个预测值由closing_prices[i:i + 2N]
+    算出。所有窗口的a矩阵都是价格数组上的跨步视图，不复制数据，
+    一次批量求伪逆代替逐个lstsq，截断阈值与lstsq默认值相同。
+    沿最后一个轴计算，可以传入(品种数, 天数)的二维数组，
+    包含nan的窗口预测值为nan
+    '''
+    closing_prices, counts = fill_nans(closing_prices)
+    size = closing_prices.shape[-1] - N * 2 + 1
+    # windows[..., i, :]为closing_prices[..., i:i + N]
+    windows = sliding_window_view(closing_prices, N, axis=-1)
+    # a[..., i, j, :]为windows[..., i + j, :]，即原来逐行填的a矩阵
+    a = np.swapaxes(sliding_window_view(
+        windows, N, axis=-2), -1, -2)[..., :size, :, :]
+    b = windows[..., N:N + size, :]
+    # 除了x还有残差　置信，lstsq的rcond默认为eps * N
+    x = np.linalg.pinv(a, np.finfo('f8').eps * N) @ \
+        b[..., np.newaxis]
+    return mask_predictions(N, (b * x[..., 0]).sum(axis=-1), counts)
+
+
+def sweep_predict(Ns, closing_prices):
+    '''
+    返回(len(Ns), ..., n)，[k, ..., t]为第t天收盘后用Ns[k]预测的
+    第t + 1天收盘价，即predict_prices的结果靠右对齐，前面补nan
+    所有N共用一个汉克尔跨步视图hankel[..., i, j, k] = c[i + j + k]，
+    N对应的a矩阵和b向量分别是它的[:N, :N]和[N, :N]切片
+    '''
+    closing_prices, counts = fill_nans(closing_prices)
+    n = closing_prices.shape[-1]
+    M = max(Ns)
+    # 右边补nan，最小的N也能取满所有窗口，补的部分不会被用到
+    padded = np.concatenate((closing_prices, np.full(
+        closing_prices.shape[:-1] + (M * 2,), np.nan)), axis=-1)
+    hankel = np.swapaxes(sliding_window_view(sliding_window_view(
+        padded, M, axis=-1), M + 1, axis=-2), -1, -2)
+    predictions = np.full((len(Ns),) + closing_prices.shape,
+                          np.nan)
+    for k, N in enumerate(Ns):
+        size = n - N * 2 + 1
+        if size <= 0:
+            continue
+        a = hankel[..., :size, :N, :N]
+        b = hankel[..., :size, N, :N]
+        x = np.linalg.pinv(a, np.finfo('f8').eps * N) @ \
+            b[..., np.newaxis]
+        predictions[k, ..., N * 2 - 1:] = mask_predictions(
+            N, (b * x[..., 0]).sum(axis=-1), counts)
+    return predictions
+
+
+def calc_pivots(highest_prices, lowest_prices,
+                closing_prices):
+    '''计算基准位pivots'''
+    pivots = (highest_prices + lowest_prices +
+              closing_prices) / 3
+    spreads = highest_prices - lowest_prices
+    supports = pivots - spreads
+    resistances = pivots + spreads
+    return pivots, supports, resistances
+
+
+def fit_line(fit_x, fit_y, line_x):
+    # 类型都是１维度和fit_x一样　
+    return fit_lines(fit_x, fit_y, line_x)
+
+
+def fit_lines(fit_x, fit_ys, line_x):
+    '''fit_ys的每一行共用fit_x，一次求出所有直线'''
+    ks, bs = linefit.fit_lines(fit_x, fit_ys)
+    return ks[..., np.newaxis] * line_x + bs[..., np.newaxis]
+
+
+def calc_diffs(closing_prices1, closing_prices2, hedge_ratios=1):
+    '''
+    价差closing_prices1 - hedge_ratios * closing_prices2，
+    参数可以是多对股票的二维数组，hedge_ratios与之广播
+    '''
+    return closing_prices1 - hedge_ratios * closing_prices2
+
+
+def fit_polys(fit_x, fit_y, fit_d, poly_x):
+    '''fit_y的每一行共用fit_x'''
+    return polyfit.eval_polys(
+        polyfit.fit_polys(fit_x, fit_y, fit_d), poly_x)
+
+
+def find_peeks(fit_x, fit_y, fit_d, min_x, max_x):
+    '''返回(..., fit_d + 1, 2)的(x, y)，不足的位置补nan'''
+    return polyfit.find_peeks(
+        polyfit.fit_polys(fit_x, fit_y, fit_d), min_x, max_x)
+
+
+def fit_peeks(fit_x, fit_y, fit_d, poly_x, min_x, max_x):
+    '''只拟合一次，同时返回fit_polys和find_peeks的结果'''
+    polys = polyfit.fit_polys(fit_x, fit_y, fit_d)
+    return polyfit.eval_polys(polys, poly_x), \
+        polyfit.find_peeks(polys, min_x, max_x)
+
+
+def find_rolling_peeks(fit_x, fit_ys, fit_d, N):
+    '''
+    每个长度为N的滑动窗口各拟合一次，返回(..., 窗口数, fit_d + 1, 2)，
+    窗口内按位置序号拟合，求出的位置再按fit_x插值换算回x
+    '''
+    polys = polyfit.rolling_polys(fit_ys, fit_d, N)
+    _, centers, scale = polys
+    peeks = polyfit.find_peeks(
+        polys, centers - scale, centers + scale)
+    peeks[..., 0] = np.interp(
+        peeks[..., 0], np.arange(len(fit_x)), fit_x)
+    return peeks
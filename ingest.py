@@ -0,0 +1,92 @@
+# 批量导入一个目录下的所有csv文件(每个文件一只股票)：
+# 多进程并行解析，主进程按完成顺序收集结果并报告进度，
+# 单个文件出错只记录下来，不影响其它文件，最后对齐成面板
+# 空文件和代码重复的文件也算出错，代码重复时保留文件名排在前面的
+# 用法：python ingest.py [-j 8] [-o store] directory
+
+import os
+import sys
+import glob
+import argparse
+import multiprocessing as mpc
+import loader
+import panel
+
+
+def find_files(directory, pattern='*.csv'):
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def read_file(filename):
+    # 导入只读一遍源文件，不经过.npy缓存：写缓存比直接解析还慢，
+    # 子进程返回结果时也要把内存映射的数组整个复制一遍
+    try:
+        columns = loader.read_data(filename, None)
+        if not columns[0].size:
+            return filename, None, None, 'empty file'
+        return filename, loader.read_symbol(filename), columns, None
+    except Exception as error:
+        return filename, None, None, '%s: %s' % (
+            type(error).__name__, error)
+
+
+def drop_duplicates(results):
+    '''results已按文件名排序，返回(保留的结果, 出错的列表)'''
+    kept, errors, seen = [], [], {}
+    for filename, symbol, columns in results:
+        if symbol in seen:
+            errors.append((filename, 'duplicate symbol %s, already in %s'
+                           % (symbol, seen[symbol])))
+        else:
+            seen[symbol] = filename
+            kept.append((filename, symbol, columns))
+    return kept, errors
+
+
+def ingest(filenames, processes=None, progress=sys.stderr):
+    '''返回(面板, 出错的(文件名, 错误信息)列表)'''
+    results, errors = [], []
+    processes = processes or os.cpu_count()
+    # 每次给子进程派一小批文件，减少进程间通信的次数
+    chunksize = max(1, len(filenames) // (processes * 16))
+    with mpc.Pool(processes) as pool:
+        for i, (filename, symbol, columns, error) in enumerate(
+                pool.imap_unordered(read_file, filenames,
+                                    chunksize), 1):
+            if error is None:
+                results.append((filename, symbol, columns))
+            else:
+                errors.append((filename, error))
+            if progress is not None:
+                print('[%d/%d] %s %s' % (i, len(filenames), filename,
+                                         error or 'ok'),
+                      file=progress)
+    # 面板中品种的顺序与文件名顺序一致，与完成顺序无关
+    results.sort(key=lambda result: result[0])
+    results, duplicates = drop_duplicates(results)
+    errors += duplicates
+    if not results:
+        return None, errors
+    return panel.align([symbol for _, symbol, _ in results],
+                       [columns for _, _, columns in results]), errors
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('-o', '--output', default='store')
+    parser.add_argument('directory')
+    args = parser.parse_args(argv[1:])
+    prices, errors = ingest(find_files(args.directory), args.jobs)
+    for filename, error in errors:
+        print(filename, error, file=sys.stderr)
+    if prices is None:
+        return 1
+    panel.save_panel(prices, args.output)
+    print('%d symbols, %d days -> %s' % (
+        len(prices.symbols), prices.dates.size, args.output))
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
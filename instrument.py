@@ -0,0 +1,141 @@
+# 可选的分阶段计时：环境变量CANDLE_PROFILE设为文件名后，
+# 各脚本main里load/compute/draw/save等阶段记录墙钟时间、CPU时间、
+# 读取的字节数和新增的matplotlib图元个数
+# 每个阶段结束时向该文件追加一行json，同时向"文件名.folded"
+# 追加一行折叠栈"阶段;子阶段 自身微秒数"，
+# 可以直接交给flamegraph.pl或speedscope画火焰图
+# 未开启时stage返回同一个空的上下文管理器，几乎没有额外开销
+# 多进程时每个进程各自按行追加，记录里带进程号；只支持单线程
+
+import os
+import sys
+import json
+import time
+import contextlib
+
+
+ENV = 'CANDLE_PROFILE'
+
+
+class Stage:
+    __slots__ = ('profiler', 'name', 'fields', 'parent', 'wall',
+                 'cpu', 'artists', 'children', 'counters')
+
+    def __init__(self, profiler, name, fields):
+        self.profiler = profiler
+        self.name = name
+        self.fields = fields
+        self.parent = None
+        self.children = 0.0
+        self.counters = {}
+
+    def path(self):
+        names = []
+        stage = self
+        while stage is not None:
+            names.append(stage.name)
+            stage = stage.parent
+        return ';'.join(reversed(names))
+
+    def __enter__(self):
+        self.parent = self.profiler.current
+        self.profiler.current = self
+        self.artists = count_artists()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        artists = count_artists() - self.artists
+        self.profiler.current = self.parent
+        if self.parent is not None:
+            self.parent.children += wall
+        self.profiler.write(self, wall, cpu, artists,
+                            exc_info[0] is not None)
+        return False
+
+
+class Profiler:
+    def __init__(self, path):
+        self.path = path
+        self.current = None
+        # 行缓冲：每条记录立即写出，子进程退出时不会丢失
+        self.log = open(path, 'a', buffering=1)
+        self.folded = open(path + '.folded', 'a', buffering=1)
+
+    def close(self):
+        self.log.close()
+        self.folded.close()
+
+    def count(self, key, value):
+        '''累加到当前阶段及其所有上级阶段'''
+        stage = self.current
+        while stage is not None:
+            stage.counters[key] = stage.counters.get(key, 0) + value
+            stage = stage.parent
+
+    def write(self, stage, wall, cpu, artists, failed):
+        path = stage.path()
+        record = dict(stage.fields, pid=os.getpid(), stage=path,
+                      wall=wall, cpu=cpu,
+                      self=wall - stage.children,
+                      bytes_read=stage.counters.get(
+                          'bytes_read', 0),
+                      artists=artists)
+        if failed:
+            record['failed'] = True
+        self.log.write(json.dumps(record) + '\n')
+        self.folded.write('%s %d\n' % (path, round(
+            (wall - stage.children) * 1e6)))
+
+
+def count_artists():
+    '''所有打开的figure里的图元总数，没有导入pyplot时为0'''
+    if 'matplotlib.pyplot' not in sys.modules:
+        return 0
+    # 不能用pyplot.figure(num)遍历，那会切换当前figure
+    from matplotlib._pylab_helpers import Gcf
+    return sum(len(manager.canvas.figure.findobj())
+               for manager in Gcf.get_all_fig_managers())
+
+
+g_profiler = None
+g_null = contextlib.nullcontext()
+
+
+def enable(path):
+    global g_profiler
+    if g_profiler is not None:
+        if g_profiler.path == path:
+            return
+        g_profiler.close()
+    g_profiler = Profiler(path)
+
+
+def disable():
+    global g_profiler
+    if g_profiler is not None:
+        g_profiler.close()
+        g_profiler = None
+
+
+def configure(envp):
+    '''envp里设置了CANDLE_PROFILE时开启，返回是否开启'''
+    path = envp.get(ENV)
+    if path:
+        enable(path)
+    return g_profiler is not None
+
+
+def stage(name, **fields):
+    '''with stage('load', file=filename): ...'''
+    if g_profiler is None:
+        return g_null
+    return Stage(g_profiler, name, fields)
+
+
+def count(key, value):
+    if g_profiler is not None:
+        g_profiler.count(key, value)
@@ -0,0 +1,21 @@
+# 延迟导入：第一次访问模块的属性时才真正导入，
+# 画图脚本里的matplotlib用它导入，只做计算时不会加载画图库
+
+import importlib
+
+
+class LazyModule:
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def lazy_import(name):
+    return LazyModule(name)
@@ -3,43 +3,24 @@
 import os
 import sys
 import platform
-import datetime as dt
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as mp
-import matplotlib.dates as md
+import loader
+import tradingdays
+from indicators import predict_prices
+import instrument
+import lazy
 
 
-def dmy2ymd(dmy):
-    return dt.datetime.strptime(
-        str(dmy, encoding='utf-8'),
-        '%d-%m-%Y').date().strftime('%Y-%m-%d')
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
 
 
 def read_data(filename):
-    dates, closing_prices = np.loadtxt(
-        filename, delimiter=',', usecols=(1, 6),
-        unpack=True, dtype=np.dtype('M8[D], f8'),
-        converters={1: dmy2ymd})
+    dates, _, _, _, closing_prices, _ = loader.read_data(
+        filename)
     return dates, closing_prices
 
 
-def predict_prices(N, closing_prices):
-    # 需要２Ｎ个数预测一个数
-    predicted_prices = np.zeros(
-        closing_prices.size - N * 2 + 1)
-    #构建a b矩阵算出系数矩阵x
-    for i in range(predicted_prices.size):
-        a = np.zeros((N, N))
-        for j in range(a.shape[0]):
-            a[j, ] = closing_prices[i + j:i + j + N]
-        b = closing_prices[i + N:i + N * 2]
-#       除了x还有残差　置信
-        x, _, _, _ = np.linalg.lstsq(a, b)
-        predicted_prices[i] = b.dot(x)
-    return predicted_prices
-
-
 def init_chart(first_day, last_day):
     mp.gcf().set_facecolor(np.ones(3) * 240 / 255)
     mp.title('Stock Price Prediction', fontsize=20)
@@ -69,15 +50,9 @@ def draw_closing_prices(dates, closing_prices):
 
 
 def draw_predicted_prices(N, dates, predicted_prices):
-    # pd.to_datetime()把（）内的变成pd时间序列
-    #pd.tseries.offsets.BDay(几天):
-    # pd.时间序列.偏移量．交易日　
-    # np.append(a,b):把b添加到a
-    #np.datetime64(a,'D')把a转换为M8日期到天的格式 
-    dates = np.append(dates, np.datetime64(
-        (pd.to_datetime(str(dates[-1])).date() +
-         pd.tseries.offsets.BDay()).strftime('%Y-%m-%d'),
-        'D'))
+    # 预测值比收盘价多一天，补上下一个交易日
+    dates = np.concatenate((
+        dates, tradingdays.next_days(dates[-1], 1)))
 
     dates = dates[N * 2:].astype(md.datetime.datetime)
 
@@ -100,14 +75,24 @@ def show_chart():
     mp.show()
 
 
-def main(argc, argv, envp):
-    dates, closing_prices = read_data('aapl.csv')
+def plot_chart(filename):
+    with instrument.stage('load', file=filename):
+        dates, closing_prices = read_data(filename)
     N = 5
-    predicted_prices = predict_prices(N, closing_prices)
-    init_chart(dates[0], dates[-1])
-    draw_closing_prices(dates, closing_prices)
-    draw_predicted_prices(N, dates, predicted_prices)
-    show_chart()
+    with instrument.stage('compute', file=filename):
+        predicted_prices = predict_prices(N, closing_prices)
+    with instrument.stage('draw', file=filename):
+        init_chart(dates[0], dates[-1])
+        draw_closing_prices(dates, closing_prices)
+        draw_predicted_prices(N, dates, predicted_prices)
+
+
+def main(argc, argv, envp):
+    instrument.configure(envp)
+    with instrument.stage('linearmodel'):
+        plot_chart('aapl.csv')
+        with instrument.stage('show'):
+            show_chart()
     return 0
 
 
@@ -0,0 +1,107 @@
+# 一元线性回归y = k * x + b，只依赖Σx、Σy、Σx²、Σxy四个和
+# 批量版本用前缀和一次得到全局、扩展窗口和滑动窗口的直线，
+# LineFitter逐个加入新点，每次更新O(1)
+# 多条y共用同一组x，ys的最后一个轴与x对齐
+
+import collections
+import numpy as np
+import rolling
+
+
+def lines_from_sums(count, sx, sy, sxx, sxy, x0, y0):
+    # 四个和都是在x - x0, y - y0上累加的，斜率不受平移影响
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ks = (count * sxy - sx * sy) / (count * sxx - sx * sx)
+        bs = (sy - ks * sx) / count + y0 - ks * x0
+    return ks, bs
+
+
+def prefix_sums(x, ys):
+    x = np.asarray(x, dtype='f8')
+    ys = np.asarray(ys, dtype='f8')
+    x0, y0 = x[:1], ys[..., :1]
+    dx, dys = x - x0, ys - y0
+    zeros = np.zeros(ys.shape[:-1] + (1,))
+    sums = []
+    for addends in (dx, dys, dx * dx, dx * dys):
+        addends = np.broadcast_to(addends, dys.shape)
+        sums.append(rolling.compensated_cumsum(
+            np.concatenate((zeros, addends), axis=-1)))
+    return sums, x0, y0
+
+
+def fit_lines(x, ys):
+    '''全部数据拟合一条直线，返回斜率和截距(形状为ys.shape[:-1])'''
+    sums, x0, y0 = prefix_sums(x, ys)
+    sums = [total[..., -1] + correction[..., -1]
+            for total, correction in sums]
+    return lines_from_sums(len(x), *sums, x0[0], y0[..., 0])
+
+
+def expanding_lines(x, ys):
+    '''第t个直线由前t + 1个点拟合，t = 0时为nan'''
+    sums, x0, y0 = prefix_sums(x, ys)
+    sums = [total[..., 1:] + correction[..., 1:]
+            for total, correction in sums]
+    counts = np.arange(1, len(x) + 1)
+    return lines_from_sums(counts, *sums, x0, y0)
+
+
+def rolling_lines(x, ys, N):
+    '''第i个直线由窗口[i, i + N)内的点拟合'''
+    sums, x0, y0 = prefix_sums(x, ys)
+    sums = [rolling.diff_sums(N, c) for c in sums]
+    return lines_from_sums(N, *sums, x0, y0)
+
+
+class LineFitter:
+    '''
+    逐点更新的直线拟合，y可以是多条直线的数组
+    window为None时使用全部历史，否则只保留最近window个点
+    滑动窗口每移出window个点，以窗口里最老的点为新的原点重算
+    四个和，加减的舍入误差不随数据流变长而累积，均摊仍是O(1)
+    '''
+    __slots__ = ('window', 'points', 'removed', 'count', 'x0', 'y0',
+                 'sx', 'sy', 'sxx', 'sxy')
+
+    def __init__(self, window=None):
+        self.window = window
+        self.points = collections.deque()
+        self.removed = 0
+        self.count = 0
+        self.x0 = self.y0 = None
+        self.sx = self.sy = self.sxx = self.sxy = 0
+
+    def add(self, dx, dy, sign):
+        self.count += sign
+        self.sx = self.sx + sign * dx
+        self.sy = self.sy + sign * dy
+        self.sxx = self.sxx + sign * dx * dx
+        self.sxy = self.sxy + sign * dx * dy
+
+    def rebase(self):
+        self.x0, self.y0 = self.points[0]
+        self.removed = self.count = 0
+        self.sx = self.sy = self.sxx = self.sxy = 0
+        for x, y in self.points:
+            self.add(x - self.x0, y - self.y0, 1)
+
+    def update(self, x, y):
+        x, y = float(x), np.asarray(y, dtype='f8')
+        if self.x0 is None:
+            self.x0, self.y0 = x, y
+        self.add(x - self.x0, y - self.y0, 1)
+        if self.window is not None:
+            self.points.append((x, y))
+            if self.count > self.window:
+                x, y = self.points.popleft()
+                self.add(x - self.x0, y - self.y0, -1)
+                self.removed += 1
+                if self.removed >= self.window:
+                    self.rebase()
+        return self.line()
+
+    def line(self):
+        return lines_from_sums(
+            self.count, self.sx, self.sy, self.sxx, self.sxy,
+            self.x0, self.y0)
@@ -0,0 +1,229 @@
+# 公共的csv读取模块，格式为：SYMBOL,DD-MM-YYYY, ,O,H,L,C,V
+# 日期列先按字符串整体读入，再用向量化的整数运算转换成M8[D]，
+# 不再逐行调用datetime.strptime
+# 解析结果按列缓存成.npy文件，之后直接内存映射读取，不再重复解析
+
+import os
+import sys
+import glob
+import hashlib
+import numpy as np
+import instrument
+
+
+CACHE_DIR = '.ohlcv_cache'
+# 缓存目录的总字节数上限，超出后按最近使用时间淘汰
+CACHE_LIMIT = 256 * 1024 * 1024
+# 本进程估计的各缓存目录的总字节数：第一次写入时扫描一次目录，
+# 之后只累加新写入的大小，超出上限时才再扫描淘汰
+g_cache_sizes = {}
+
+
+def check_dates(dmys, valid):
+    if not valid.all():
+        raise ValueError('invalid date %r, expected DD-MM-YYYY' %
+                         str(dmys[~valid][0]))
+
+
+def dmy2days(dmys):
+    dmys = np.asarray(dmys, dtype=str).reshape(-1)
+    if dmys.dtype.itemsize > np.dtype('U10').itemsize:
+        check_dates(dmys, np.char.str_len(dmys) <= 10)
+    # 'U10'的每个字符是一个uint32，视作(n, 10)的字符矩阵
+    dmys = np.ascontiguousarray(dmys, dtype='U10')
+    chars = dmys.view(np.uint32).reshape(-1, 10)
+    digits = chars.astype(np.int64) - ord('0')
+    # 第2、5个字符是'-'，其余都是数字，不足10个字符的补了'\0'
+    dashes = np.isin(np.arange(10), (2, 5))
+    check_dates(dmys, np.where(dashes, chars == ord('-'),
+                               (digits >= 0) & (digits <= 9)).all(
+                                   axis=1))
+    days = digits[:, 0] * 10 + digits[:, 1]
+    months = digits[:, 3] * 10 + digits[:, 4]
+    years = digits[:, 6] * 1000 + digits[:, 7] * 100 + \
+        digits[:, 8] * 10 + digits[:, 9]
+    # 年->月->日逐级累加，得到距1970-01-01的天数
+    dates = (years - 1970).astype('M8[Y]').astype('M8[M]') + \
+        (months - 1).astype('m8[M]')
+    # 月份、日期越界时会进位到别的日期，先检查在当月的天数以内
+    lengths = ((dates + 1).astype('M8[D]') -
+               dates.astype('M8[D]')).astype(np.int64)
+    check_dates(dmys, (months >= 1) & (months <= 12) &
+                (days >= 1) & (days <= lengths))
+    return dates.astype('M8[D]') + (days - 1).astype('m8[D]')
+
+
+def days2dmy(dates):
+    # dmy2days的逆运算：'YYYY-MM-DD'的字符重新排列成'DD-MM-YYYY'
+    ymds = np.datetime_as_string(
+        np.asarray(dates, dtype='M8[D]'), unit='D').astype('U10')
+    chars = ymds.view(np.uint32).reshape(-1, 10)
+    dmys = np.ascontiguousarray(
+        chars[:, [8, 9, 7, 5, 6, 4, 0, 1, 2, 3]])
+    return dmys.view('U10').reshape(-1)
+
+
+def dates2weekdays(dates):
+    # 1970-01-01是星期四，星期一为0
+    return (dates.astype(np.int64) + 3) % 7
+
+
+def parse_lines(lines):
+    '''lines可以是文件名，也可以是文本行的列表(分块读取时)'''
+    # 日期多读一个字符，超过10个字符的日期在dmy2days里报错
+    dmys, opening_prices, highest_prices, lowest_prices, \
+        closing_prices, volumes = np.loadtxt(
+            lines, delimiter=',', usecols=(1, 3, 4, 5, 6, 7),
+            unpack=True, ndmin=1,
+            dtype=np.dtype('U11, f8, f8, f8, f8, f8'))
+    dates = dmy2days(dmys)
+    return dates, opening_prices, highest_prices, \
+        lowest_prices, closing_prices, volumes
+
+
+def parse_data(filename):
+    instrument.count('bytes_read', os.path.getsize(filename))
+    return parse_lines(filename)
+
+
+def cache_paths(filename, cache_dir):
+    # 键由源文件的绝对路径、大小和修改时间组成，源文件一变旧键自然失效
+    stat = os.stat(filename)
+    prefix = hashlib.sha1(os.path.abspath(filename).encode(
+        'utf-8')).hexdigest()[:16]
+    key = '%s-%d-%d' % (prefix, stat.st_size, stat.st_mtime_ns)
+    base = os.path.join(cache_dir, key)
+    return base + '.dates.npy', base + '.prices.npy'
+
+
+def remove_file(path):
+    '''
+    删除失败时跳过：文件可能已被别的进程删除，Windows上还可能
+    正被本进程或别的进程内存映射，此时删除或覆盖会抛PermissionError
+    '''
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        return False
+    return True
+
+
+def save_cache(dates_path, prices_path, dates, prices):
+    '''写不了缓存(目录只读、文件正被映射等)时什么也不做'''
+    cache_dir = os.path.dirname(dates_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+    except OSError:
+        return
+    # 先写临时文件再改名，避免其它进程读到写了一半的缓存
+    for path, array in ((dates_path, dates), (prices_path, prices)):
+        tmp_path = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(tmp_path, 'wb') as file:
+                np.save(file, array)
+            os.replace(tmp_path, path)
+        except OSError:
+            remove_file(tmp_path)
+            return
+    total = g_cache_sizes.get(cache_dir)
+    size = dates.nbytes + prices.nbytes
+    if total is None or total + size > CACHE_LIMIT:
+        total = evict_cache(cache_dir, CACHE_LIMIT)
+    else:
+        total += size
+    g_cache_sizes[cache_dir] = total
+
+
+def evict_cache(cache_dir, limit):
+    '''
+    先删除同一源文件的旧版本(键的前缀相同，最近用过的是当前版本)，
+    再按最近使用时间淘汰，返回剩下的总字节数
+    '''
+    entries, newest = [], {}
+    for path in glob.glob(os.path.join(cache_dir, '*.npy')):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        # 文件名为'前缀-大小-修改时间.dates.npy'
+        key = os.path.basename(path).rsplit('.', 2)[0]
+        prefix = key.split('-', 1)[0]
+        entries.append((stat.st_mtime, stat.st_size, path, prefix, key))
+        newest[prefix] = max(newest.get(prefix, (0, key)),
+                             (stat.st_mtime, key))
+    total = sum(entry[1] for entry in entries)
+    fresh = []
+    for mtime, size, path, prefix, key in entries:
+        if key != newest[prefix][1]:
+            if remove_file(path):
+                total -= size
+        else:
+            fresh.append((mtime, size, path))
+    # 最久没有用过的先淘汰
+    for _, size, path in sorted(fresh):
+        if total <= limit:
+            break
+        if remove_file(path):
+            total -= size
+    return total
+
+
+def load_cache(dates_path, prices_path):
+    try:
+        dates = np.load(dates_path, mmap_mode='r')
+        prices = np.load(prices_path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    instrument.count('bytes_read', dates.nbytes + prices.nbytes)
+    # 命中后刷新修改时间，供淘汰策略使用，目录只读时不刷新
+    for path in (dates_path, prices_path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return dates, prices
+
+
+def read_data(filename, cache_dir=CACHE_DIR):
+    '''返回dates, opening, highest, lowest, closing, volumes
+    cache_dir为None时不使用缓存'''
+    if cache_dir is None:
+        return parse_data(filename)
+    dates_path, prices_path = cache_paths(
+        filename, cache_dir)
+    cached = load_cache(dates_path, prices_path)
+    if cached is None:
+        dates, opening_prices, highest_prices, \
+            lowest_prices, closing_prices, volumes = parse_data(
+                filename)
+        # 每个价格列在(5, n)的C序数组里都是连续的一行
+        prices = np.vstack((opening_prices, highest_prices,
+                            lowest_prices, closing_prices, volumes))
+        save_cache(dates_path, prices_path, dates, prices)
+        cached = load_cache(dates_path, prices_path)
+        if cached is None:
+            return dates, opening_prices, highest_prices, \
+                lowest_prices, closing_prices, volumes
+    dates, prices = cached
+    return (dates,) + tuple(prices)
+
+
+def read_symbol(filename):
+    # 股票代码在每行的第一列
+    with open(filename, encoding='utf-8') as file:
+        return file.readline().split(',', 1)[0]
+
+
+def main(argc, argv, envp):
+    for filename in argv[1:] if argc > 1 else ['aapl.csv']:
+        dates, opening_prices, highest_prices, \
+            lowest_prices, closing_prices, volumes = read_data(
+                filename)
+        print(filename, dates.size, dates[0], dates[-1])
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
@@ -0,0 +1,92 @@
+# 长周期图表的细节层次(LOD)：根据图的像素宽度，
+# Ｋ线合并成周线/月线/年线，折线按桶保留最小最大值，
+# 刻度定位器和格式也随之切换，画图的开销不再随天数增长
+
+import numpy as np
+import resample
+import lazy
+
+
+md = lazy.lazy_import('matplotlib.dates')
+
+
+WIDTH = 1920
+# 每根Ｋ线至少占用的像素数
+PIXELS_PER_BAR = 8
+# 折线每个桶保留最小值和最大值两个点
+PIXELS_PER_BUCKET = 2
+g_units = ('D', 'W', 'M', 'Y')
+# 每根Ｋ线覆盖的天数，用来确定实体的宽度
+g_unit_days = {'D': 1, 'W': 7, 'M': 30.44, 'Y': 365.25}
+
+
+def choose_unit(dates, width=WIDTH):
+    bars = width // PIXELS_PER_BAR
+    for unit in g_units:
+        if resample.bucket_starts(resample.bucket_keys(
+                unit, dates)).size <= bars:
+            return unit
+    return g_units[-1]
+
+
+def candle_width(unit):
+    return 0.8 * g_unit_days[unit]
+
+
+def resample_ohlc(unit, dates, opening_prices, highest_prices,
+                  lowest_prices, closing_prices):
+    if unit == 'D':
+        return dates, opening_prices, highest_prices, \
+            lowest_prices, closing_prices
+    return resample.resample_ohlc(
+        unit, dates, opening_prices, highest_prices,
+        lowest_prices, closing_prices)[:5]
+
+
+def minmax_indices(values, buckets):
+    size = -(-values.size // buckets)
+    blocks = -(-values.size // size)
+    padded = np.pad(values, (0, blocks * size - values.size),
+                    mode='edge').reshape(blocks, size)
+    offsets = np.arange(blocks) * size
+    return np.minimum(np.concatenate((
+        offsets + padded.argmin(axis=1),
+        offsets + padded.argmax(axis=1))), values.size - 1)
+
+
+def minmax_downsample(dates, *series, width=WIDTH):
+    '''
+    折线降采样：等长分桶，每个桶保留最小值和最大值所在的点，
+    多条折线取下标的并集，保证共用同一组日期，首尾两点总会保留
+    '''
+    buckets = width // PIXELS_PER_BUCKET
+    if dates.size <= buckets * 2:
+        return (dates,) + series
+    indices = np.unique(np.concatenate(
+        [[0, dates.size - 1]] + [minmax_indices(values, buckets)
+                                 for values in series]))
+    return (dates[indices],) + tuple(
+        values[indices] for values in series)
+
+
+def set_locators(ax, unit):
+    if unit == 'D':
+        # 设置星期一为x轴主刻度，日期为次刻度
+        major = md.WeekdayLocator(byweekday=md.MO)
+        minor = md.DayLocator()
+        format = '%d %b %Y'
+    elif unit == 'W':
+        major = md.AutoDateLocator(maxticks=12)
+        minor = md.WeekdayLocator(byweekday=md.MO)
+        format = '%b %Y'
+    elif unit == 'M':
+        major = md.YearLocator()
+        minor = md.MonthLocator()
+        format = '%Y'
+    else:
+        major = md.AutoDateLocator(maxticks=12)
+        minor = md.YearLocator()
+        format = '%Y'
+    ax.xaxis.set_major_locator(major)
+    ax.xaxis.set_minor_locator(minor)
+    ax.xaxis.set_major_formatter(md.DateFormatter(format))
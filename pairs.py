@@ -0,0 +1,175 @@
+# 配对交易的候选筛选：一个窗口内所有品种两两之间的相关系数和
+# 最小二乘对冲比率，由去均值后的窗口矩阵相乘一次得到(BLAS)，
+# 协方差矩阵按行分块计算，每块(BLOCK, 品种数)，
+# 各块交给线程池并行(矩阵乘法期间释放GIL)
+# best_pairs每块当场只留前K名，各块的候选再合并，不保存完整矩阵，
+# 内存只取决于块的大小；需要完整矩阵时才用pair_matrices
+# 窗口内有nan的品种与其它品种的结果都是nan
+# 用法：python pairs.py [-n 60] [-k 20] [-j 4] store
+#       python pairs.py [-n 60] [-k 20] [-j 4] a.csv b.csv ...
+
+import os
+import sys
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from indicators import calc_diffs
+from screener import load, top_k
+
+
+BLOCK = 256
+
+
+def center_window(values, N, end):
+    '''窗口[end - N, end)去均值，返回(去均值的窗口, 离差平方和)'''
+    window = values[:, end - N:end]
+    centered = window - window.mean(axis=1, keepdims=True)
+    return centered, np.einsum('ij,ij->i', centered, centered)
+
+
+def pair_block(centered, squares, rows, cols=slice(None)):
+    '''rows行与cols列之间的(相关系数, 对冲比率)'''
+    # 离差积之和，除以N后为协方差，比值中N约掉
+    products = centered[rows] @ centered[cols].T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return products / np.sqrt(squares[rows, np.newaxis] *
+                                  squares[cols]), \
+            products / squares[cols]
+
+
+def upper_top_k(corrs, K):
+    '''
+    corrs为对角线在左上角的一块，只看对角线右边的元素(i < j)，
+    返回前K名在块内的(行, 列)下标
+    '''
+    upper = np.arange(corrs.shape[1]) > \
+        np.arange(corrs.shape[0])[:, np.newaxis]
+    best = top_k(np.where(upper, corrs, np.nan).ravel(), K)
+    return np.unravel_index(best, corrs.shape)
+
+
+def pair_matrices(values, N, ends=None, block=BLOCK, workers=None):
+    '''
+    values为(品种数, 天数)，每个窗口[end - N, end)得到两个(品种数,
+    品种数)的矩阵，返回(corrs, betas)，形状(len(ends), 品种数, 品种数)
+    betas[k, i, j]为窗口k内i对j回归的对冲比率：i ≈ beta * j + c
+    ends默认只取最后一个窗口，np.arange(N, 天数 + 1)即为滑动窗口，
+    此时内存为len(ends) * 品种数 ** 2，只要最好的几对时用best_pairs
+    '''
+    values = np.asarray(values, dtype='f8')
+    symbols, days = values.shape
+    ends = np.array([days]) if ends is None else np.asarray(ends)
+    corrs = np.empty((len(ends), symbols, symbols))
+    betas = np.empty_like(corrs)
+
+    def run(k, centered, squares, start):
+        rows = slice(start, start + block)
+        corrs[k, rows], betas[k, rows] = pair_block(
+            centered, squares, rows)
+
+    with ThreadPoolExecutor(workers) as pool:
+        for k, end in enumerate(ends):
+            centered, squares = center_window(values, N, end)
+            # 一个窗口的所有块算完再算下一个窗口
+            for future in [pool.submit(run, k, centered, squares,
+                                       start)
+                           for start in range(0, symbols, block)]:
+                future.result()
+    return corrs, betas
+
+
+def best_pairs(values, N, K, ends=None, block=BLOCK, workers=None):
+    '''
+    参数与pair_matrices相同，但每个窗口只返回相关系数最大的K对(i < j)，
+    为(行下标, 列下标, 相关系数, 对冲比率)，按相关系数从大到小，
+    每块只算对角线及其右边的列，当场取前K名，每个窗口最多保留
+    块数 * K个候选
+    '''
+    values = np.asarray(values, dtype='f8')
+    symbols, days = values.shape
+    ends = np.array([days]) if ends is None else np.asarray(ends)
+
+    def run(centered, squares, start):
+        corrs, betas = pair_block(centered, squares,
+                                  slice(start, start + block),
+                                  slice(start, None))
+        i, j = upper_top_k(corrs, K)
+        return i + start, j + start, corrs[i, j], betas[i, j]
+
+    results = []
+    with ThreadPoolExecutor(workers) as pool:
+        for end in ends:
+            centered, squares = center_window(values, N, end)
+            candidates = [np.concatenate(values) for values in zip(*[
+                future.result() for future in [
+                    pool.submit(run, centered, squares, start)
+                    for start in range(0, symbols, block)]])]
+            best = top_k(candidates[2], K)
+            results.append(tuple(values[best]
+                                 for values in candidates))
+    return results
+
+
+def top_pairs(corrs, K, block=BLOCK):
+    '''完整矩阵中相关系数最大的K对(i < j)，返回两个下标数组'''
+    candidates = []
+    for start in range(0, corrs.shape[-1], block):
+        i, j = upper_top_k(corrs[start:start + block, start:], K)
+        candidates.append((i + start, j + start))
+    rows, cols = (np.concatenate(values)
+                  for values in zip(*candidates))
+    best = top_k(corrs[rows, cols], K)
+    return rows[best], cols[best]
+
+
+def calc_zscores(spreads):
+    '''最后一天的价差偏离窗口均值多少个标准差'''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return (spreads[..., -1] - spreads.mean(axis=-1)) / \
+            spreads.std(axis=-1)
+
+
+def find_pairs(symbols, closing_prices, N=60, K=20, block=BLOCK,
+               workers=None):
+    '''
+    按最后N天收盘价的相关系数取前K对，
+    每对为(代码i, 代码j, 相关系数, 对冲比率, 价差的z值)，
+    价差为i - 对冲比率 * j
+    '''
+    closing_prices = np.asarray(closing_prices, dtype='f8')
+    N = min(N, closing_prices.shape[-1])
+    (rows, cols, corrs, hedge_ratios), = best_pairs(
+        closing_prices, N, K, None, block, workers)
+    window = closing_prices[:, -N:]
+    spreads = calc_diffs(window[rows], window[cols],
+                         hedge_ratios[:, np.newaxis])
+    zscores = calc_zscores(spreads)
+    return [(symbols[i], symbols[j], float(corr),
+             float(hedge_ratio), float(zscore))
+            for i, j, corr, hedge_ratio, zscore in zip(
+                rows, cols, corrs, hedge_ratios, zscores)]
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-n', '--window', type=int, default=60)
+    parser.add_argument('-k', '--top', type=int, default=20)
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('sources', nargs='+')
+    args = parser.parse_args(argv[1:])
+    prices = load(args.sources)
+    if prices.dates.size < 2:
+        print('need at least 2 trading days', file=sys.stderr)
+        return 1
+    print('%-10s %-10s %8s %8s %8s' % (
+        'SYMBOL1', 'SYMBOL2', 'CORR', 'HEDGE', 'ZSCORE'))
+    for symbol1, symbol2, corr, hedge_ratio, zscore in find_pairs(
+            prices.symbols, prices.closing_prices, args.window,
+            args.top, workers=args.jobs):
+        print('%-10s %-10s %8.4f %8.4f %8.2f' % (
+            symbol1, symbol2, corr, hedge_ratio, zscore))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
@@ -0,0 +1,92 @@
+# 多只股票的面板数据：每个字段一个(品种数, 天数)的连续float64数组，
+# 所有品种共用一个M8[D]交易日历，某只股票缺少的交易日填nan
+# 日历是全部日期排序去重后的并集，各文件的日期用searchsorted定位
+# 面板可以按列存成目录下的.npy文件，打开时内存映射
+
+import os
+import numpy as np
+import loader
+
+
+g_fields = ('opening_prices', 'highest_prices', 'lowest_prices',
+            'closing_prices', 'volumes')
+
+
+class Panel:
+    __slots__ = ('symbols', 'dates') + g_fields
+
+    def __init__(self, symbols, dates, opening_prices,
+                 highest_prices, lowest_prices, closing_prices,
+                 volumes):
+        self.symbols = list(symbols)
+        self.dates = dates
+        self.opening_prices = opening_prices
+        self.highest_prices = highest_prices
+        self.lowest_prices = lowest_prices
+        self.closing_prices = closing_prices
+        self.volumes = volumes
+
+    @property
+    def mask(self):
+        '''有数据的位置为True'''
+        return ~np.isnan(self.closing_prices)
+
+    @property
+    def shape(self):
+        return self.closing_prices.shape
+
+    def fields(self):
+        return tuple(getattr(self, field) for field in g_fields)
+
+    def index(self, symbol):
+        return self.symbols.index(symbol)
+
+    def take(self, symbols):
+        '''按代码取出部分品种，得到新的面板'''
+        rows = [self.index(symbol) for symbol in symbols]
+        return Panel(symbols, self.dates, *(
+            field[rows] for field in self.fields()))
+
+    def dropna(self):
+        '''只保留所有品种都有数据的交易日'''
+        columns = self.mask.all(axis=0)
+        return Panel(self.symbols, self.dates[columns], *(
+            field[:, columns] for field in self.fields()))
+
+
+def align(symbols, series):
+    '''series为loader.read_data返回值的列表'''
+    dates = np.unique(np.concatenate(
+        [columns[0] for columns in series]))
+    fields = [np.full((len(series), dates.size), np.nan)
+              for _ in g_fields]
+    for row, columns in enumerate(series):
+        positions = np.searchsorted(dates, columns[0])
+        for field, values in zip(fields, columns[1:]):
+            field[row, positions] = values
+    return Panel(symbols, dates, *fields)
+
+
+def save_panel(prices, directory):
+    os.makedirs(directory, exist_ok=True)
+    np.save(os.path.join(directory, 'symbols.npy'),
+            np.array(prices.symbols, dtype=str))
+    np.save(os.path.join(directory, 'dates.npy'), prices.dates)
+    for field in g_fields:
+        np.save(os.path.join(directory, field + '.npy'),
+                getattr(prices, field))
+
+
+def open_panel(directory, mmap_mode='r'):
+    def load(name):
+        return np.load(os.path.join(directory, name + '.npy'),
+                       mmap_mode=mmap_mode)
+    return Panel(load('symbols').tolist(), load('dates'), *(
+        load(field) for field in g_fields))
+
+
+def load_panel(filenames):
+    symbols = [loader.read_symbol(filename)
+               for filename in filenames]
+    return align(symbols, [loader.read_data(filename)
+                           for filename in filenames])
@@ -3,55 +3,24 @@
 import os
 import sys
 import platform
-import datetime as dt
 import numpy as np
-import matplotlib.pyplot as mp
-import matplotlib.dates as md
+import loader
+import panel
+from indicators import calc_diffs, fit_peeks
+import instrument
+import lazy
 
 
-def dmy2ymd(dmy):
-    return dt.datetime.strptime(
-        str(dmy, encoding='utf-8'),
-        '%d-%m-%Y').date().strftime('%Y-%m-%d')
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
 
 
 def read_data(filename):
-    dates, closing_prices = np.loadtxt(
-        filename, delimiter=',', usecols=(1, 6),
-        unpack=True, dtype=np.dtype('M8[D], f8'),
-        converters={1: dmy2ymd})
+    dates, _, _, _, closing_prices, _ = loader.read_data(
+        filename)
     return dates, closing_prices
 
 
-def calc_diffs(bhp_closing_prices, vale_closing_prices):
-    return bhp_closing_prices - vale_closing_prices
-
-
-def fit_polys(fit_x, fit_y, fit_d, poly_x):
-    fit_p = np.polyfit(fit_x, fit_y, fit_d)
-    poly_y = np.polyval(fit_p, poly_x)
-    return poly_y
-
-
-def find_peeks(fit_x, fit_y, fit_d, min_x, max_x):
-    # 求得拟合的函数fit_p
-    fit_p = np.polyfit(fit_x, fit_y, fit_d)
-    # fit_p求导
-    der_p = np.polyder(fit_p)
-    # 求到函数为０的根，数学格式为a+-bi
-    roots = np.roots(der_p)
-    # 取实数根的实部
-    reals = roots[np.isreal(roots)].real
-    peeks = [[min_x, np.polyval(fit_p, min_x)]]
-    for real in reals:
-        if min_x < real and real < max_x:
-            peeks.append([real, np.polyval(fit_p, real)])
-    peeks.append([max_x, np.polyval(fit_p, max_x)])
-    peeks.sort()
-    peeks = np.array(peeks)
-    return peeks
-
-
 def init_chart(first_day, last_day):
     mp.gcf().set_facecolor(np.ones(3) * 240 / 255)
     mp.title('Polynomial Fitting', fontsize=20)
@@ -88,7 +57,9 @@ def draw_polys(dates, polys, degree):
 
 
 def draw_peeks(peeks):
-    dates, peeks = np.hsplit(peeks, 2)
+    # 去掉补位的nan，再拆成两个一维数组
+    peeks = peeks[~np.isnan(peeks[:, 0])]
+    dates, peeks = peeks.T
     # find_peeks解得的根是浮点数，即dates是浮点数
     dates = dates.astype(int).astype('M8[D]').astype(
         md.datetime.datetime)
@@ -119,22 +90,37 @@ def show_chart():
     mp.show()
 
 
-def main(argc, argv, envp):
-    dates, bhp_closing_prices = read_data('BHP.csv')
-    dates, vale_closing_prices = read_data('VALE.csv')
-    diffs = calc_diffs(bhp_closing_prices,
-                       vale_closing_prices)
-    # 将日期转换成想对于计算机元年的天数
-    days = dates.astype(int)
+def plot_chart(bhp_filename, vale_filename):
+    files = '+'.join((bhp_filename, vale_filename))
+    with instrument.stage('load', file=files):
+        # 按交易日对齐，只保留两只股票都有数据的交易日
+        prices = panel.load_panel(
+            (bhp_filename, vale_filename)).dropna()
+    dates = prices.dates
+    bhp_closing_prices, vale_closing_prices = \
+        prices.closing_prices
     degree = 5
-    polys = fit_polys(days, diffs, degree, days)
-    peeks = find_peeks(days, diffs, degree,
-                       days[0], days[-1])
-    init_chart(dates[0], dates[-1])
-    draw_diffs(dates, diffs)
-    draw_polys(dates, polys, degree)
-    draw_peeks(peeks)
-    show_chart()
+    with instrument.stage('compute', file=files):
+        diffs = calc_diffs(bhp_closing_prices,
+                           vale_closing_prices)
+        # 将日期转换成想对于计算机元年的天数
+        days = dates.astype(int)
+        # 一次拟合同时得到拟合曲线和峰谷点
+        polys, peeks = fit_peeks(days, diffs, degree, days,
+                                 days[0], days[-1])
+    with instrument.stage('draw', file=files):
+        init_chart(dates[0], dates[-1])
+        draw_diffs(dates, diffs)
+        draw_polys(dates, polys, degree)
+        draw_peeks(peeks)
+
+
+def main(argc, argv, envp):
+    instrument.configure(envp)
+    with instrument.stage('poly'):
+        plot_chart('BHP.csv', 'VALE.csv')
+        with instrument.stage('show'):
+            show_chart()
     return 0
 
 
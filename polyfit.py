@@ -0,0 +1,106 @@
+# 多项式拟合y = c0 + c1 * t + ... + cd * t^d，t = (x - center) / scale
+# x先平移缩放到[-1, 1]，范德蒙矩阵的条件数小得多，不再有RankWarning
+# 同一组x的范德蒙矩阵只做一次QR分解，得到解算矩阵R⁻¹Qᵀ，
+# 所有y序列(以及所有滑动窗口)乘同一个矩阵就得到全部系数
+# 导数为0的点由伴随矩阵的特征值批量求出，不再逐个调用np.roots
+# 多条y共用同一组x，ys的最后一个轴与x对齐，系数按t的升幂排在最后一个轴
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def scale_x(x):
+    x = np.asarray(x, dtype='f8')
+    center = (x.max() + x.min()) / 2
+    scale = (x.max() - x.min()) / 2 or 1.0
+    return (x - center) / scale, center, scale
+
+
+def solver(t, degree):
+    '''最小二乘的解算矩阵，形状(degree + 1, len(t))'''
+    q, r = np.linalg.qr(np.vander(t, degree + 1, increasing=True))
+    return np.linalg.solve(r, q.T)
+
+
+def fit_polys(x, ys, degree):
+    '''全部数据拟合，返回(系数, center, scale)'''
+    t, center, scale = scale_x(x)
+    ys = np.asarray(ys, dtype='f8')
+    return ys @ solver(t, degree).T, center, scale
+
+
+def rolling_polys(ys, degree, N):
+    '''
+    第i个多项式由窗口[i, i + N)拟合，x为位置序号，
+    所有窗口的t相同，共用一次分解；center按窗口排在最后一个轴
+    '''
+    t, center, scale = scale_x(np.arange(N))
+    windows = sliding_window_view(
+        np.asarray(ys, dtype='f8'), N, axis=-1)
+    coefs = windows @ solver(t, degree).T
+    return coefs, np.arange(coefs.shape[-2]) + center, scale
+
+
+def polyval(coefs, t):
+    '''Horner法，t与coefs.shape[:-1]广播'''
+    y = np.zeros(np.broadcast_shapes(coefs.shape[:-1], np.shape(t)))
+    for k in range(coefs.shape[-1] - 1, -1, -1):
+        y = y * t + coefs[..., k]
+    return y
+
+
+def eval_polys(polys, x):
+    '''在一维的x处求值，形状为coefs.shape[:-1] + x.shape'''
+    coefs, center, scale = polys
+    t = (np.asarray(x, dtype='f8') - np.expand_dims(center, -1)) / \
+        np.expand_dims(scale, -1)
+    return polyval(coefs[..., np.newaxis, :], t)
+
+
+def derivative(coefs):
+    return coefs[..., 1:] * np.arange(1, coefs.shape[-1])
+
+
+def real_roots(coefs):
+    '''
+    伴随矩阵的特征值就是多项式的根，np.linalg.eigvals一次算完整批，
+    形状为coefs.shape[:-1] + (次数,)，复根为nan；
+    首项系数为0或含nan的多项式整行为nan
+    '''
+    degree = coefs.shape[-1] - 1
+    shape = coefs.shape[:-1]
+    if degree < 1:
+        return np.empty(shape + (0,))
+    leading = coefs[..., -1]
+    valid = (leading != 0) & np.isfinite(coefs).all(axis=-1)
+    companion = np.zeros(shape + (degree, degree))
+    companion[..., np.arange(1, degree), np.arange(degree - 1)] = 1
+    companion[..., :, -1] = -coefs[..., :-1] / np.where(
+        valid, leading, 1)[..., np.newaxis]
+    companion[~valid] = 0
+    roots = np.linalg.eigvals(companion)
+    return np.where((roots.imag == 0) & valid[..., np.newaxis],
+                    roots.real, np.nan)
+
+
+def find_peeks(polys, min_x, max_x):
+    '''
+    (min_x, max_x)内导数为0的点加上两个端点，按x排序，
+    形状为coefs.shape[:-1] + (degree + 1, 2)，每行为(x, y)，
+    区间外的根和复根为nan，排在最后
+    '''
+    coefs, center, scale = polys
+    center = np.expand_dims(center, -1)
+    scale = np.expand_dims(scale, -1)
+    min_x = np.expand_dims(min_x, -1)
+    max_x = np.expand_dims(max_x, -1)
+    ts = real_roots(derivative(coefs))
+    xs = ts * scale + center
+    with np.errstate(invalid='ignore'):
+        xs[~((min_x < xs) & (xs < max_x))] = np.nan
+    shape = xs.shape[:-1] + (1,)
+    xs = np.concatenate((np.broadcast_to(min_x, shape), xs,
+                         np.broadcast_to(max_x, shape)), axis=-1)
+    xs = np.sort(xs, axis=-1)
+    ys = polyval(coefs[..., np.newaxis, :], (xs - center) / scale)
+    return np.stack((xs, ys), axis=-1)
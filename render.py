@@ -0,0 +1,98 @@
+# 批量无界面出图：每个进程使用非交互的Agg后端，
+# 一个任务画一张图并保存为png/svg，画完立即关闭figure释放内存
+# 用法：python render.py [-c cs,sma] [-f png] [-o charts] [-j 4] \
+#           aapl.csv BHP.csv+VALE.csv ...
+# 形如A.csv+B.csv的参数是poly.py需要的一对股票
+
+import os
+import sys
+import argparse
+import importlib
+import multiprocessing as mpc
+import instrument
+
+
+# 图表模块 -> 需要的csv文件个数
+g_charts = {'cs': 1, 'sma': 1, 'sbb': 1, 'trendline': 1,
+            'linearmodel': 1, 'poly': 2}
+FIGSIZE = (19.2, 10.8)
+DPI = 100
+
+
+def init_worker():
+    # 必须在导入pyplot之前指定后端
+    import matplotlib
+    matplotlib.use('Agg')
+    instrument.configure(os.environ)
+
+
+def render_chart(task):
+    chart, filenames, output = task
+    import matplotlib.pyplot as mp
+    figure = mp.figure(figsize=FIGSIZE, dpi=DPI)
+    try:
+        with instrument.stage(chart, output=output):
+            importlib.import_module(chart).plot_chart(*filenames)
+            with instrument.stage('save'):
+                figure.savefig(output,
+                               facecolor=figure.get_facecolor())
+    except Exception as error:
+        return output, '%s: %s' % (type(error).__name__, error)
+    finally:
+        mp.close(figure)
+    return output, None
+
+
+def make_tasks(charts, sources, directory, format):
+    tasks = []
+    for source in sources:
+        filenames = tuple(source.split('+'))
+        symbol = '+'.join(os.path.splitext(os.path.basename(
+            filename))[0] for filename in filenames)
+        for chart in charts:
+            if g_charts[chart] == len(filenames):
+                tasks.append((chart, filenames, os.path.join(
+                    directory, '%s_%s.%s' % (symbol, chart,
+                                             format))))
+    return tasks
+
+
+def render_charts(tasks, processes=None, maxtasksperchild=50):
+    '''返回出错的(输出文件, 错误信息)列表'''
+    errors = []
+    # 每个子进程画完一定数量的图后重启，防止内存持续增长
+    with mpc.Pool(processes, initializer=init_worker,
+                  maxtasksperchild=maxtasksperchild) as pool:
+        for i, (output, error) in enumerate(
+                pool.imap_unordered(render_chart, tasks), 1):
+            if error is not None:
+                errors.append((output, error))
+            print('[%d/%d] %s %s' % (i, len(tasks), output,
+                                     error or 'ok'),
+                  file=sys.stderr)
+    return errors
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-c', '--charts', default=','.join(g_charts))
+    parser.add_argument('-f', '--format', default='png',
+                        choices=('png', 'svg'))
+    parser.add_argument('-o', '--output', default='charts')
+    parser.add_argument('-j', '--jobs', type=int, default=None)
+    parser.add_argument('sources', nargs='+')
+    args = parser.parse_args(argv[1:])
+    instrument.configure(envp)
+    charts = args.charts.split(',')
+    for chart in charts:
+        if chart not in g_charts:
+            parser.error('unknown chart: %s' % chart)
+    os.makedirs(args.output, exist_ok=True)
+    tasks = make_tasks(charts, args.sources, args.output,
+                       args.format)
+    errors = render_charts(tasks, args.jobs)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
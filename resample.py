@@ -0,0 +1,83 @@
+# 把日线重采样成周线、月线、季线、年线：
+# 每个周期取第一个开盘价、最高价的最大值、最低价的最小值、
+# 最后一个收盘价和成交量之和。周期按日历划分，节假日和不完整的周
+# 不需要特殊处理；分组统计用ufunc.reduceat一次完成
+# 价格数组可以是(品种数, 天数)的二维数组，共用一个日期轴，
+# 缺失的数据用nan表示，每个周期只统计有数据的天
+
+import numpy as np
+
+
+g_units = ('D', 'W', 'M', 'Q', 'Y')
+
+
+def bucket_keys(unit, dates):
+    days = dates.astype('M8[D]').astype(np.int64)
+    if unit == 'D':
+        return days
+    if unit == 'W':
+        # 1970-01-01是星期四，加3后以星期一为一周的开始
+        return (days + 3) // 7
+    if unit == 'Q':
+        return dates.astype('M8[M]').astype(np.int64) // 3
+    return dates.astype('M8[%s]' % unit).astype(np.int64)
+
+
+def bucket_starts(keys):
+    '''keys须已排序，返回每个周期第一天的下标，没有数据时为空'''
+    if not len(keys):
+        return np.empty(0, dtype=np.intp)
+    return np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+
+
+def first_last(values, valid, starts):
+    # 每个周期内第一个和最后一个有效值，没有有效值的周期为nan
+    n = values.shape[-1]
+    indices = np.arange(n)
+    firsts = np.minimum.reduceat(
+        np.where(valid, indices, n), starts, axis=-1)
+    lasts = np.maximum.reduceat(
+        np.where(valid, indices, -1), starts, axis=-1)
+    empty = lasts < 0
+    firsts = np.take_along_axis(
+        values, np.minimum(firsts, n - 1), axis=-1)
+    lasts = np.take_along_axis(
+        values, np.maximum(lasts, 0), axis=-1)
+    firsts[empty] = lasts[empty] = np.nan
+    return firsts, lasts, empty
+
+
+def resample_ohlc(unit, dates, opening_prices, highest_prices,
+                  lowest_prices, closing_prices):
+    '''返回每个周期第一个交易日的日期和周期的开高低收'''
+    starts = bucket_starts(bucket_keys(unit, dates))
+    opening_prices, highest_prices, lowest_prices, \
+        closing_prices = np.broadcast_arrays(*(np.asarray(
+            prices, dtype='f8') for prices in (
+                opening_prices, highest_prices, lowest_prices,
+                closing_prices)))
+    valid = ~np.isnan(closing_prices)
+    opening_prices, _, _ = first_last(
+        opening_prices, valid, starts)
+    _, closing_prices, empty = first_last(
+        closing_prices, valid, starts)
+    # fmax、fmin忽略nan
+    highest_prices = np.fmax.reduceat(
+        highest_prices, starts, axis=-1)
+    lowest_prices = np.fmin.reduceat(
+        lowest_prices, starts, axis=-1)
+    return dates[starts], opening_prices, highest_prices, \
+        lowest_prices, closing_prices, starts, empty
+
+
+def resample_ohlcv(unit, dates, opening_prices, highest_prices,
+                   lowest_prices, closing_prices, volumes):
+    dates, opening_prices, highest_prices, lowest_prices, \
+        closing_prices, starts, empty = resample_ohlc(
+            unit, dates, opening_prices, highest_prices,
+            lowest_prices, closing_prices)
+    volumes = np.add.reduceat(np.nan_to_num(np.asarray(
+        volumes, dtype='f8')), starts, axis=-1)
+    volumes[empty] = np.nan
+    return dates, opening_prices, highest_prices, \
+        lowest_prices, closing_prices, volumes
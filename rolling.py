@@ -0,0 +1,214 @@
+# 滑动窗口统计：均值、标准差、最大最小值，复杂度均为O(n)
+# 所有函数都沿最后一个轴计算，可以直接处理(品种数, 天数)的二维数组
+# 返回值长度为n - N + 1，第i个元素对应窗口[i, i + N)
+# 只有包含nan的窗口结果为nan，不影响其它窗口
+
+import numpy as np
+
+
+def compensated_cumsum(a, correction=0.0):
+    '''
+    补偿前缀和：先正常累加，再用TwoSum求出每一步加法的舍入误差，
+    误差本身再累加一次作为修正项，返回(前缀和, 修正项)
+    a的最后一维第一个元素须为0；接着上一段继续累加时，
+    第一个元素为上一段最后的前缀和，correction为上一段最后的修正项
+    '''
+    sums = np.cumsum(a, axis=-1)
+    prevs, addends = sums[..., :-1], a[..., 1:]
+    virtuals = sums[..., 1:] - prevs
+    errors = (prevs - (sums[..., 1:] - virtuals)) + \
+        (addends - virtuals)
+    corrections = np.zeros_like(sums)
+    corrections[..., 0] = correction
+    # correction + e0与从头累加时的运算顺序相同
+    errors[..., :1] += correction
+    np.cumsum(errors, axis=-1, out=corrections[..., 1:])
+    return sums, corrections
+
+
+def nan_counts(a):
+    '''nan个数的前缀和，窗口[i, i + N)里的个数为c[i + N] - c[i]'''
+    return np.concatenate((np.zeros(a.shape[:-1] + (1,), dtype=np.intp),
+                           np.cumsum(np.isnan(a), axis=-1)), axis=-1)
+
+
+def window_sums(a):
+    '''
+    平移后的补偿前缀和：先减去每行第一个有效值再累加，
+    返回shift, c1, counts，窗口和为c1[i + N] - c1[i]
+    c1为(前缀和, 修正项)；nan按0累加，counts为nan_counts的结果，
+    没有nan时为None
+    '''
+    a = np.asarray(a, dtype='f8')
+    nans = np.isnan(a)
+    if nans.any():
+        shift = np.nan_to_num(np.take_along_axis(
+            a, (~nans).argmax(axis=-1)[..., np.newaxis], -1))
+        deltas = np.where(nans, 0, a - shift)
+        counts = nan_counts(a)
+    else:
+        shift = a[..., :1]
+        deltas = a - shift
+        counts = None
+    zeros = np.zeros(a.shape[:-1] + (1,))
+    c1 = compensated_cumsum(np.concatenate((zeros, deltas), axis=-1))
+    return shift, c1, counts
+
+
+def diff_sums(N, c):
+    sums, corrections = c
+    return (sums[..., N:] - sums[..., :-N]) + \
+        (corrections[..., N:] - corrections[..., :-N])
+
+
+def means_from_sums(N, shift, c1, counts=None):
+    means = diff_sums(N, c1) / N + shift
+    if counts is not None:
+        means[counts[..., N:] - counts[..., :-N] > 0] = np.nan
+    return means
+
+
+def partial_moments(deltas):
+    '''
+    沿最后一个轴的各个前缀的(均值, 离差平方和)，均值相对平移量，
+    离差平方和为Σd² - (Σd)² / k，平移量是前缀里的一个元素时，
+    Σd²不超过离差平方和的2k倍，不会有大的抵消
+    '''
+    counts = np.arange(1, deltas.shape[-1] + 1)
+    s1 = np.cumsum(deltas, axis=-1)
+    s2 = np.cumsum(deltas * deltas, axis=-1)
+    return s1 / counts, s2 - s1 * s1 / counts
+
+
+def block_moments(blocks):
+    '''
+    blocks为(..., N)，返回每块各个前缀和后缀的(均值, 离差平方和)：
+    prefix_means, prefix_m2s, suffix_means, suffix_m2s，
+    前缀[..., j]对应blocks[..., :j + 1]，相对块的第一个元素，
+    后缀[..., j]对应blocks[..., j:]，相对块的最后一个元素
+    '''
+    firsts, lasts = blocks[..., :1], blocks[..., -1:]
+    prefix_means, prefix_m2s = partial_moments(blocks - firsts)
+    suffix_means, suffix_m2s = (np.flip(values, axis=-1)
+                                for values in partial_moments(
+                                    np.flip(blocks, axis=-1) - lasts))
+    return prefix_means + firsts, prefix_m2s, \
+        suffix_means + lasts, suffix_m2s
+
+
+def combine_moments(N, r, suffix_means, suffix_m2s, prefix_means,
+                    prefix_m2s):
+    '''
+    长N的窗口由一块长N - r的后缀和下一块长r的前缀组成(r为0时就是
+    后缀那一整块)，按Chan等人的公式合并两部分，返回方差
+    '''
+    deltas = prefix_means - suffix_means
+    m2s = suffix_m2s + np.where(r == 0, 0, prefix_m2s) + \
+        deltas * deltas * ((N - r) * r / N)
+    # 负数只可能来自舍入误差
+    return np.maximum(m2s / N, 0)
+
+
+def rolling_variances(a, N):
+    '''
+    与rolling_extreme一样按N分块，任意窗口都正好是某块的一个后缀
+    加上下一块的一个前缀；每部分相对自己的一个元素计算，
+    价格远离序列的第一个值时也不会因E[d²] - E[d]²而失去精度
+    '''
+    a = np.asarray(a, dtype='f8')
+    n = a.shape[-1]
+    if n < N:
+        return np.empty(a.shape[:-1] + (0,))
+    blocks = -(-n // N)
+    padding = [(0, 0)] * (a.ndim - 1) + [(0, blocks * N - n)]
+    padded = np.pad(a, padding, mode='edge').reshape(
+        a.shape[:-1] + (blocks, N))
+    prefix_means, prefix_m2s, suffix_means, suffix_m2s = (
+        values.reshape(a.shape[:-1] + (-1,))
+        for values in block_moments(padded))
+    size = n - N + 1
+    # 窗口i的后缀从i开始，前缀到i + N - 1结束
+    return combine_moments(
+        N, np.arange(size) % N, suffix_means[..., :size],
+        suffix_m2s[..., :size], prefix_means[..., N - 1:n],
+        prefix_m2s[..., N - 1:n])
+
+
+def rolling_moments(a, windows):
+    '''
+    均值由一次累加得到，多个窗口长度共用；
+    标准差按rolling_variances分块计算，返回(均值, 标准差)的列表
+    '''
+    a = np.asarray(a, dtype='f8')
+    return [(means, np.sqrt(rolling_variances(a, N)))
+            for N, means in zip(windows, rolling_means(a, windows))]
+
+
+def sweep_means(a, windows):
+    '''
+    与rolling_means相同，但返回(len(windows), ..., n)的张量，
+    每个窗口长度的结果靠右对齐，第t个值对应窗口(t - N, t]，
+    前N - 1个位置为nan
+    '''
+    shift, c1, counts = window_sums(a)
+    n = c1[0].shape[-1] - 1
+    means = np.full((len(windows),) + shift.shape[:-1] + (n,), np.nan)
+    for k, N in enumerate(windows):
+        if N <= n:
+            means[k, ..., N - 1:] = means_from_sums(N, shift, c1,
+                                                    counts)
+    return means
+
+
+def sweep_moments(a, windows):
+    '''返回(均值, 标准差)两个张量，形状与sweep_means相同'''
+    a = np.asarray(a, dtype='f8')
+    means = sweep_means(a, windows)
+    stds = np.full_like(means, np.nan)
+    for k, N in enumerate(windows):
+        if N <= a.shape[-1]:
+            stds[k, ..., N - 1:] = np.sqrt(rolling_variances(a, N))
+    return means, stds
+
+
+def rolling_means(a, windows):
+    '''一次累加，得到多个窗口长度的均值列表'''
+    shift, c1, counts = window_sums(a)
+    return [means_from_sums(N, shift, c1, counts) for N in windows]
+
+
+def rolling_mean(a, N):
+    return rolling_means(a, (N,))[0]
+
+
+def rolling_std(a, N):
+    return rolling_moments(a, (N,))[0][1]
+
+
+def rolling_extreme(a, N, func):
+    '''
+    van Herk/Gil-Werman算法：按N分块，块内做前缀和后缀的累计极值，
+    任意窗口都正好跨越一个块边界，结果为后缀值与前缀值的极值
+    '''
+    a = np.asarray(a, dtype='f8')
+    n = a.shape[-1]
+    if n < N:
+        return np.empty(a.shape[:-1] + (0,))
+    blocks = -(-n // N)
+    padding = [(0, 0)] * (a.ndim - 1) + [(0, blocks * N - n)]
+    padded = np.pad(a, padding, mode='edge').reshape(
+        a.shape[:-1] + (blocks, N))
+    prefix = func.accumulate(padded, axis=-1).reshape(
+        a.shape[:-1] + (-1,))
+    suffix = np.flip(func.accumulate(
+        np.flip(padded, axis=-1), axis=-1), axis=-1).reshape(
+            a.shape[:-1] + (-1,))
+    return func(suffix[..., :n - N + 1], prefix[..., N - 1:n])
+
+
+def rolling_max(a, N):
+    return rolling_extreme(a, N, np.maximum)
+
+
+def rolling_min(a, N):
+    return rolling_extreme(a, N, np.minimum)
@@ -1,40 +1,25 @@
 import os
 import sys
 import platform
-import datetime as dt
 import numpy as np
-import matplotlib.pyplot as mp
-import matplotlib.dates as md
+import loader
+import lod
+from indicators import calc_sbb
+import instrument
+import lazy
 
 
-def dmy2ymd(dmy):
-    return dt.datetime.strptime(
-        str(dmy, encoding='utf-8'),
-        '%d-%m-%Y').date().strftime('%Y-%m-%d')
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
 
 
 def read_data(filename):
-    dates, closing_prices = np.loadtxt(
-        filename, delimiter=',', usecols=(1, 6),
-        unpack=True, dtype=np.dtype('M8[D], f8'),
-        converters={1: dmy2ymd})
+    dates, _, _, _, closing_prices, _ = loader.read_data(
+        filename)
     return dates, closing_prices
 
 
-def calc_sbb(N, closing_prices):
-    weights = np.ones(N)
-    weights /= weights.sum()
-    sbb_medios = np.convolve(closing_prices, weights, 'valid')
-    stds = []
-    for i in range(sbb_medios.size):
-        stds.append(np.std(closing_prices[i:i + N]))
-    double_stds = np.array(stds) * 2
-    sbb_lowers = sbb_medios - double_stds
-    sbb_uppers = sbb_medios + double_stds
-    return sbb_medios, sbb_lowers, sbb_uppers
-
-
-def init_chart(first_day, last_day):
+def init_chart(first_day, last_day, unit='D'):
     mp.gcf().set_facecolor(np.ones(3) * 240 / 255)
     mp.title('Simple Movine Average', fontsize=20)
     mp.xlabel('Trading Days From %s To %s' % (
@@ -44,12 +29,8 @@ def init_chart(first_day, last_day):
             '%d %b %Y')), fontsize=14)
     mp.ylabel('Stock Price (USD) Of Apple Inc.',
               fontsize=14)
-    ax = mp.gca()
-    ax.xaxis.set_major_locator(
-        md.WeekdayLocator(byweekday=md.MO))
-    ax.xaxis.set_minor_locator(md.DayLocator())
-    ax.xaxis.set_major_formatter(
-        md.DateFormatter('%d %b %Y'))
+    # 刻度的粒度与降采样的粒度一致
+    lod.set_locators(mp.gca(), unit)
 
     mp.tick_params(which='both', top=True, right=True,
                    labelright=True, labelsize=10)
@@ -84,16 +65,28 @@ def show_chart():
     mp.show()
 
 
-def main(argc, argv, envp):
-    dates, closing_prices = read_data('aapl.csv')
-    init_chart(dates[0], dates[-1])
-    draw_closing_prices(dates, closing_prices)
+def plot_chart(filename):
+    with instrument.stage('load', file=filename):
+        dates, closing_prices = read_data(filename)
     N = 5
-    sbb_medios, sbb_lowers, sbb_uppers = calc_sbb(
-        N, closing_prices)
-    draw_sbb(N, dates[N - 1:], sbb_medios,
-             sbb_lowers, sbb_uppers)
-    show_chart()
+    with instrument.stage('compute', file=filename):
+        sbb_medios, sbb_lowers, sbb_uppers = calc_sbb(
+            N, closing_prices)
+    with instrument.stage('draw', file=filename):
+        init_chart(dates[0], dates[-1], lod.choose_unit(dates))
+        # 先用全部数据计算，画图前再降采样
+        draw_closing_prices(*lod.minmax_downsample(
+            dates, closing_prices))
+        draw_sbb(N, *lod.minmax_downsample(
+            dates[N - 1:], sbb_medios, sbb_lowers, sbb_uppers))
+
+
+def main(argc, argv, envp):
+    instrument.configure(envp)
+    with instrument.stage('sbb'):
+        plot_chart('aapl.csv')
+        with instrument.stage('show'):
+            show_chart()
     return 0
 
 
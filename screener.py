@@ -0,0 +1,124 @@
+# 全市场基准位筛选：在面板上一次向量化算出所有品种的支撑位、
+# 基准位和阻力位，第t天的价位由第t - 1天的最高、最低、收盘价算出，
+# 开盘前就已确定；再看第t天的收盘价是否穿过这些价位、离各价位多远，
+# 排名用np.argpartition只取前K名，不对全部品种排序
+# 用法：python screener.py [-k 20] store
+#       python screener.py [-k 20] a.csv b.csv ...
+# store为ingest.py保存的面板目录
+
+import os
+import sys
+import argparse
+import numpy as np
+import panel
+from indicators import calc_pivots
+
+
+g_levels = ('support', 'pivot', 'resistance')
+
+
+def calc_levels(highest_prices, lowest_prices, closing_prices):
+    '''
+    返回(3, ...)的支撑位、基准位、阻力位，沿最后一个轴后移一天，
+    第0天没有前一天的数据，为nan
+    '''
+    levels = np.full((3,) + np.shape(closing_prices), np.nan)
+    pivots, supports, resistances = calc_pivots(
+        highest_prices[..., :-1], lowest_prices[..., :-1],
+        closing_prices[..., :-1])
+    levels[0, ..., 1:] = supports
+    levels[1, ..., 1:] = pivots
+    levels[2, ..., 1:] = resistances
+    return levels
+
+
+def calc_distances(closing_prices, levels):
+    '''收盘价相对各价位的距离(比例)，正数表示收在价位之上'''
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return closing_prices / levels - 1
+
+
+def calc_breaches(closing_prices, levels):
+    '''收盘价突破阻力位为1，跌破支撑位为-1，其余(包括nan)为0'''
+    with np.errstate(invalid='ignore'):
+        return (closing_prices > levels[2]).astype(np.int8) - \
+            (closing_prices < levels[0]).astype(np.int8)
+
+
+def top_k(scores, K):
+    '''分数最大的K个下标，从大到小，nan不参加排名'''
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    K = min(K, scores.size)
+    if K <= 0:
+        return np.empty(0, dtype=np.intp)
+    # 只有选出来的K个需要排序
+    indices = np.argpartition(-scores, K - 1)[:K]
+    indices = indices[np.argsort(-scores[indices], kind='stable')]
+    return indices[np.isfinite(scores[indices])]
+
+
+def screen(prices, K=20):
+    '''
+    按面板的最后一个交易日筛选，
+    返回(突破阻力位的前K名, 跌破支撑位的前K名)，
+    每名为(代码, 收盘价, 支撑位, 基准位, 阻力位, 距离)，
+    距离是离被穿过的价位的比例，越大排名越靠前
+    '''
+    # 只需要最后两天，内存映射的面板只会读入这两列
+    highest_prices, lowest_prices, closing_prices = (
+        np.asarray(field[:, -2:]) for field in (
+            prices.highest_prices, prices.lowest_prices,
+            prices.closing_prices))
+    levels = calc_levels(highest_prices, lowest_prices,
+                         closing_prices)[..., -1]
+    closing_prices = closing_prices[:, -1]
+    distances = calc_distances(closing_prices, levels)
+    breaches = calc_breaches(closing_prices, levels)
+
+    def rank(breach, level, sign):
+        indices = top_k(np.where(breaches == breach,
+                                 sign * distances[level], np.nan), K)
+        return [(prices.symbols[i], float(closing_prices[i]),
+                 *levels[:, i].tolist(),
+                 float(sign * distances[level, i]))
+                for i in indices]
+    return rank(1, 2, 1), rank(-1, 0, -1)
+
+
+def load(sources):
+    if len(sources) == 1 and os.path.isdir(sources[0]):
+        return panel.open_panel(sources[0])
+    return panel.load_panel(sources)
+
+
+def print_rows(title, rows):
+    print(title)
+    print('%-10s %10s %10s %10s %10s %8s' % (
+        'SYMBOL', 'CLOSE', 'SUPPORT', 'PIVOT', 'RESISTANCE',
+        'DIST%'))
+    for symbol, closing_price, support, pivot, resistance, \
+            distance in rows:
+        print('%-10s %10.2f %10.2f %10.2f %10.2f %8.2f' % (
+            symbol, closing_price, support, pivot, resistance,
+            distance * 100))
+
+
+def main(argc, argv, envp):
+    parser = argparse.ArgumentParser(prog=argv[0])
+    parser.add_argument('-k', '--top', type=int, default=20)
+    parser.add_argument('sources', nargs='+')
+    args = parser.parse_args(argv[1:])
+    prices = load(args.sources)
+    if prices.dates.size < 2:
+        print('need at least 2 trading days', file=sys.stderr)
+        return 1
+    breakouts, breakdowns = screen(prices, args.top)
+    print('Trading day:', prices.dates[-1])
+    print_rows('Closed above resistance:', breakouts)
+    print()
+    print_rows('Closed below support:', breakdowns)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(len(sys.argv), sys.argv, os.environ))
@@ -3,40 +3,25 @@
 import os
 import sys
 import platform
-import datetime as dt
 import numpy as np
-import matplotlib.pyplot as mp
-import matplotlib.dates as md
+import loader
+import lod
+from indicators import sweep_sma
+import instrument
+import lazy
 
 
-def dmy2ymd(dmy):
-    return dt.datetime.strptime(
-        str(dmy, encoding='utf-8'),
-        '%d-%m-%Y').date().strftime('%Y-%m-%d')
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
 
 
 def read_data(filename):
-    dates, closing_prices = np.loadtxt(
-        filename, delimiter=',', usecols=(1, 6),
-        unpack=True, dtype=np.dtype('M8[D], f8'),
-        converters={1: dmy2ymd})
+    dates, _, _, _, closing_prices, _ = loader.read_data(
+        filename)
     return dates, closing_prices
 
 
-def calc_sma(N, closing_prices):
-    '''
-    计算简单移动均线方法２：
-    weights = np.ones(N)
-    weights /= weights.sum()
-    sma = np.convolve(closing_prices, weights, 'valid')
-    '''
-    sma = np.zeros(closing_prices.size - (N - 1))
-    for i in range(sma.size):
-        sma[i] = closing_prices[i:i + N].mean()
-    return sma
-
-
-def init_chart(first_day, last_day):
+def init_chart(first_day, last_day, unit='D'):
     mp.gcf().set_facecolor(np.ones(3) * 240 / 255)
     mp.title('Simple Movine Average', fontsize=20)
     mp.xlabel('Trading Days From %s To %s' % (
@@ -46,12 +31,8 @@ def init_chart(first_day, last_day):
             '%d %b %Y')), fontsize=14)
     mp.ylabel('Stock Price (USD) Of Apple Inc.',
               fontsize=14)
-    ax = mp.gca()
-    ax.xaxis.set_major_locator(
-        md.WeekdayLocator(byweekday=md.MO))
-    ax.xaxis.set_minor_locator(md.DayLocator())
-    ax.xaxis.set_major_formatter(
-        md.DateFormatter('%d %b %Y'))
+    # 刻度的粒度与降采样的粒度一致
+    lod.set_locators(mp.gca(), unit)
 
     mp.tick_params(which='both', top=True, right=True,
                    labelright=True, labelsize=10)
@@ -83,20 +64,29 @@ def show_chart():
     mp.show()
 
 
+def plot_chart(filename):
+    with instrument.stage('load', file=filename):
+        dates, closing_prices = read_data(filename)
+    Ns = (5, 10, 15)
+    with instrument.stage('compute', file=filename):
+        # (len(Ns), 天数)，所有N共用一次前缀和
+        smas = sweep_sma(Ns, closing_prices)
+    with instrument.stage('draw', file=filename):
+        init_chart(dates[0], dates[-1], lod.choose_unit(dates))
+        # 先用全部数据计算，画图前再降采样
+        draw_closing_prices(*lod.minmax_downsample(
+            dates, closing_prices))
+        for N, sma in zip(Ns, smas):
+            draw_sma(N, *lod.minmax_downsample(
+                dates[N - 1:], sma[N - 1:]))
+
+
 def main(argc, argv, envp):
-    dates, closing_prices = read_data('aapl.csv')
-    init_chart(dates[0], dates[-1])
-    draw_closing_prices(dates, closing_prices)
-    N = 5
-    sma = calc_sma(N, closing_prices)
-    draw_sma(N, dates[N - 1:], sma)
-    N = 10
-    sma = calc_sma(N, closing_prices)
-    draw_sma(N, dates[N - 1:], sma)
-    N = 15
-    sma = calc_sma(N, closing_prices)
-    draw_sma(N, dates[N - 1:], sma)
-    show_chart()
+    instrument.configure(envp)
+    with instrument.stage('sma'):
+        plot_chart('aapl.csv')
+        with instrument.stage('show'):
+            show_chart()
     return 0
 
 
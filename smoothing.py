@@ -0,0 +1,83 @@
+# 指数平滑类指标(EMA、Wilder平滑)的公共内核
+# 递推式y[t] = a * y[t - 1] + (1 - a) * x[t]按块展开：
+# 块内每个输出都是块前一个输出与块内输入的线性组合，
+# 一个块只需要一次矩阵乘法，Python循环次数为n / BLOCK
+# 所有函数沿最后一个轴计算，支持(品种数, 天数)的二维数组
+# 与逐个递推相同，一个nan输入之后的输出都是nan，之前的不受影响
+
+import numpy as np
+
+
+BLOCK = 128
+
+
+def linear_filter(x, a, y0, block=BLOCK):
+    x = np.asarray(x, dtype='f8')
+    # nan乘以核里的0仍是nan，会改掉同一块里更早的输出，
+    # 先换成0做矩阵乘法，最后把第一个nan及以后的输出置为nan
+    nans = np.isnan(x)
+    poisoned = None
+    if nans.any():
+        poisoned = np.logical_or.accumulate(nans, axis=-1)
+        x = np.where(nans, 0, x)
+    y = np.empty_like(x)
+    lags = np.arange(block)
+    powers = a ** (lags + 1)
+    # kernel[j, i] = (1 - a) * a ** (i - j)，下三角以外为0
+    exponents = lags[np.newaxis, :] - lags[:, np.newaxis]
+    kernel = np.where(exponents >= 0, (1 - a) * a ** np.maximum(
+        exponents, 0), 0)
+    prev = np.array(np.broadcast_to(y0, x.shape[:-1]), dtype='f8')
+    for start in range(0, x.shape[-1], block):
+        stop = min(start + block, x.shape[-1])
+        size = stop - start
+        y[..., start:stop] = prev[..., np.newaxis] * \
+            powers[:size] + x[..., start:stop] @ kernel[:size, :size]
+        prev = y[..., stop - 1]
+    if poisoned is not None:
+        y[poisoned] = np.nan
+    return y
+
+
+def seeded_filter(x, N, a):
+    '''
+    每行前N个有效值的均值作为种子，放在第N个有效值的位置，
+    之前为nan；有效值不足N个的行全为nan
+    '''
+    x = np.asarray(x, dtype='f8')
+    y = np.full_like(x, np.nan)
+    n = x.shape[-1]
+    if n < N:
+        return y
+    valid = ~np.isnan(x)
+    counts = np.cumsum(valid, axis=-1)
+    seeded = counts[..., -1] >= N
+    ends = np.where(seeded, np.argmax(counts >= N, axis=-1), n - 1)
+    if (ends == N - 1).all():
+        # 常见情况：每行的前N个值都有效
+        seed = x[..., :N].mean(axis=-1)
+        y[..., N - 1] = seed
+        y[..., N:] = linear_filter(x[..., N:], a, seed)
+        return y
+    firsts = np.argsort(~valid, axis=-1, kind='stable')[..., :N]
+    seed = np.take_along_axis(x, firsts, -1).mean(axis=-1)
+    # 每行左移到种子的下一天开始，平滑后再移回原来的位置
+    indices = np.arange(n) + ends[..., np.newaxis] + 1
+    shifted = np.where(indices < n, np.take_along_axis(
+        x, np.minimum(indices, n - 1), -1), 0)
+    filtered = linear_filter(shifted, a, seed)
+    indices = np.arange(n) - ends[..., np.newaxis] - 1
+    y = np.where(indices >= 0, np.take_along_axis(
+        filtered, np.maximum(indices, 0), -1), np.nan)
+    np.put_along_axis(y, ends[..., np.newaxis], seed[..., np.newaxis],
+                      -1)
+    y[~seeded] = np.nan
+    return y
+
+
+def ema(x, N):
+    return seeded_filter(x, N, 1 - 2 / (N + 1))
+
+
+def wilder(x, N):
+    return seeded_filter(x, N, 1 - 1 / N)
@@ -0,0 +1,175 @@
+# 逐根Ｋ线更新的指标：每次update(bar)只做O(1)的计算，
+# 状态只保留窗口长度的环形缓冲区和累加和，
+# bar的格式与loader.read_data的一行相同：
+# (date, opening, highest, lowest, closing, volume)
+# 数据不够一个窗口时update返回None
+# 布林带的标准差与rolling.rolling_variances一样按N分块，
+# 每满一块算一次该块的后缀，均摊到每根Ｋ线仍是O(1)
+# 均线、布林带、基准位、预测价与批量函数的运算顺序完全一致，
+# 结果逐位相同；ATR的批量版本按块做矩阵乘法，两者只差舍入误差
+
+import collections
+import numpy as np
+import rolling
+
+
+class CompensatedSum:
+    '''与rolling.window_sums相同的平移补偿累加'''
+    __slots__ = ('history',)
+
+    def __init__(self, N):
+        # 保存最近N + 1个(前缀和, 修正项)，窗口和为首尾之差
+        self.history = collections.deque([(0.0, 0.0)], maxlen=N + 1)
+
+    def add(self, delta):
+        prev, correction = self.history[-1]
+        total = prev + delta
+        virtual = total - prev
+        correction += (prev - (total - virtual)) + \
+            (delta - virtual)
+        self.history.append((total, correction))
+
+    def full(self):
+        return len(self.history) == self.history.maxlen
+
+    def window_sum(self):
+        (first, first_correction), (last, last_correction) = \
+            self.history[0], self.history[-1]
+        return (last - first) + (last_correction - first_correction)
+
+
+class SMAStream:
+    __slots__ = ('N', 'shift', 'sums')
+
+    def __init__(self, N):
+        self.N = N
+        self.shift = None
+        self.sums = CompensatedSum(N)
+
+    def update(self, bar):
+        closing_price = float(bar[4])
+        if self.shift is None:
+            self.shift = closing_price
+        self.sums.add(closing_price - self.shift)
+        if not self.sums.full():
+            return None
+        return self.sums.window_sum() / self.N + self.shift
+
+
+class SBBStream:
+    '''返回(中轨, 下轨, 上轨)'''
+    __slots__ = ('N', 'shift', 'sums', 'block', 'first', 's1', 's2',
+                 'suffixes')
+
+    def __init__(self, N):
+        self.N = N
+        self.shift = None
+        self.sums = CompensatedSum(N)
+        # 当前块的值、第一个值和前缀的累加和
+        self.block = []
+        self.first = self.s1 = self.s2 = 0.0
+        # 上一个满块各个后缀的(均值, 离差平方和)
+        self.suffixes = None
+
+    def update(self, bar):
+        closing_price = float(bar[4])
+        if self.shift is None:
+            self.shift = closing_price
+        self.sums.add(closing_price - self.shift)
+        if not self.block:
+            self.first = closing_price
+            self.s1 = self.s2 = 0.0
+        self.block.append(closing_price)
+        delta = closing_price - self.first
+        self.s1 += delta
+        self.s2 += delta * delta
+        k = len(self.block)
+        prefix_mean = self.s1 / k + self.first
+        prefix_m2 = self.s2 - self.s1 * self.s1 / k
+        if k == self.N:
+            _, _, suffix_means, suffix_m2s = rolling.block_moments(
+                np.array(self.block))
+            self.suffixes = suffix_means, suffix_m2s
+            self.block = []
+        if not self.sums.full():
+            return None
+        # 窗口由上一块从r起的后缀和当前块的前r个值组成
+        r = k % self.N
+        variance = rolling.combine_moments(
+            self.N, r, self.suffixes[0][r], self.suffixes[1][r],
+            prefix_mean, prefix_m2)
+        sbb_medio = self.sums.window_sum() / self.N + self.shift
+        double_std = np.sqrt(variance) * 2
+        return sbb_medio, sbb_medio - double_std, \
+            sbb_medio + double_std
+
+
+class ATRStream:
+    '''Wilder平滑的ATR，前N个真实波幅的均值作为种子'''
+    __slots__ = ('N', 'prev_closing_price', 'trs', 'atr')
+
+    def __init__(self, N=14):
+        self.N = N
+        self.prev_closing_price = None
+        self.trs = []
+        self.atr = None
+
+    def update(self, bar):
+        highest_price, lowest_price, closing_price = \
+            float(bar[2]), float(bar[3]), float(bar[4])
+        prev_closing_price = self.prev_closing_price
+        self.prev_closing_price = closing_price
+        if prev_closing_price is None:
+            return None
+        tr = max(highest_price, prev_closing_price) - \
+            min(lowest_price, prev_closing_price)
+        if self.atr is None:
+            self.trs.append(tr)
+            if len(self.trs) < self.N:
+                return None
+            self.atr = np.mean(self.trs)
+            self.trs = None
+        else:
+            a = 1 - 1 / self.N
+            self.atr = a * self.atr + (1 - a) * tr
+        return self.atr
+
+
+class PivotStream:
+    '''返回(基准位, 支撑位, 阻力位)'''
+    __slots__ = ()
+
+    def update(self, bar):
+        highest_price, lowest_price, closing_price = \
+            float(bar[2]), float(bar[3]), float(bar[4])
+        pivot = (highest_price + lowest_price +
+                 closing_price) / 3
+        spread = highest_price - lowest_price
+        return pivot, pivot - spread, pivot + spread
+
+
+class PredictStream:
+    '''用最近2N个收盘价预测下一个交易日的收盘价'''
+    __slots__ = ('N', 'closing_prices')
+
+    def __init__(self, N):
+        self.N = N
+        self.closing_prices = collections.deque(maxlen=N * 2)
+
+    def update(self, bar):
+        self.closing_prices.append(float(bar[4]))
+        if len(self.closing_prices) < self.N * 2:
+            return None
+        N = self.N
+        closing_prices = np.array(self.closing_prices)
+        a = np.lib.stride_tricks.sliding_window_view(
+            closing_prices[:-1], N)[np.newaxis]
+        b = closing_prices[np.newaxis, N:]
+        x = np.linalg.pinv(a, np.finfo('f8').eps * N) @ \
+            b[..., np.newaxis]
+        return (b * x[..., 0]).sum(axis=-1)[0]
+
+
+def feed(stream, bars):
+    '''把历史数据逐根喂给stream，返回每次update的结果'''
+    return [stream.update(bar) for bar in bars]
@@ -0,0 +1,36 @@
+# 交易日历：基于np.busdaycalendar，可以指定周工作日和节假日列表，
+# 一次向量化调用生成未来N个交易日，或把日期换算成交易日序号
+# (命名为tradingdays而不是calendar，避免遮住标准库的calendar模块)
+
+import numpy as np
+
+
+WEEKMASK = '1111100'
+HOLIDAYS = ()
+
+
+def make_calendar(holidays=HOLIDAYS, weekmask=WEEKMASK):
+    return np.busdaycalendar(weekmask=weekmask,
+                             holidays=np.asarray(holidays, 'M8[D]'))
+
+
+g_calendar = make_calendar()
+
+
+def next_days(last_day, count, calendar=None):
+    '''
+    last_day之后的count个交易日
+    last_day不是交易日时先退到前一个交易日，与pandas的BDay一致
+    '''
+    return np.busday_offset(
+        np.datetime64(last_day, 'D'), np.arange(1, count + 1),
+        roll='backward', busdaycal=calendar or g_calendar)
+
+
+def ordinals(dates, origin=None, calendar=None):
+    '''每个日期距origin(默认为第一个日期)的交易日个数'''
+    dates = np.asarray(dates, dtype='M8[D]')
+    if origin is None:
+        origin = dates[0]
+    return np.busday_count(origin, dates,
+                           busdaycal=calendar or g_calendar)
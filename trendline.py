@@ -1,52 +1,27 @@
 import os
 import sys
 import platform
-import datetime as dt
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as mp
-import matplotlib.dates as md
+import loader
+import candles
+import tradingdays
+from indicators import calc_pivots, fit_lines
+import instrument
+import lazy
 
 
-def dmy2ymd(dmy):
-    return dt.datetime.strptime(
-        str(dmy, encoding='utf-8'),
-        '%d-%m-%Y').date().strftime('%Y-%m-%d')
+mp = lazy.lazy_import('matplotlib.pyplot')
+md = lazy.lazy_import('matplotlib.dates')
 
 
 def read_data(filename):
     dates, opening_prices, highest_prices, \
-        lowest_prices, closing_prices = np.loadtxt(
-            filename, delimiter=',',
-            usecols=(1, 3, 4, 5, 6), unpack=True,
-            dtype=np.dtype('M8[D], f8, f8, f8, f8'),
-            converters={1: dmy2ymd})
+        lowest_prices, closing_prices, _ = loader.read_data(
+            filename)
     return dates, opening_prices, highest_prices, \
         lowest_prices, closing_prices
 
 
-def calc_pivots(highest_prices, lowest_prices,
-                closing_prices):
-    '''计算基准位pivots'''
-    pivots = (highest_prices + lowest_prices +
-              closing_prices) / 3
-    spreads = highest_prices - lowest_prices
-    supports = pivots - spreads
-    resistances = pivots + spreads
-    return pivots, supports, resistances
-
-
-def fit_line(fit_x, fit_y, line_x):
-    # 类型都是１维度和fit_x一样　
-    ones = np.ones_like(fit_x)
-    a = np.vstack([fit_x, ones]).T
-    b = fit_y
-    x = np.linalg.lstsq(a, b)[0]
-    k, b = x[0], x[1]
-    line_y = k * line_x + b
-    return line_y
-
-
 def init_chart(first_day, last_day):
     mp.gcf().set_facecolor(np.ones(3) * 240 / 255)
     mp.title('Trend Line', fontsize=20)
@@ -72,19 +47,14 @@ def init_chart(first_day, last_day):
 def draw_candlestick(
         dates, opening_prices, highest_prices,
         lowest_prices, closing_prices):
-    dates = dates.astype(md.datetime.datetime)
     up = closing_prices - opening_prices >= 1e-2
     down = opening_prices - closing_prices >= 1e-2
     fc = np.zeros(dates.size, dtype='3f4')
     ec = np.zeros(dates.size, dtype='3f4')
     fc[up], fc[down] = (1, 1, 1), (0.85, 0.85, 0.85)
     ec[up], ec[down] = (0.85, 0.85, 0.85), (0.85, 0.85, 0.85)
-    mp.bar(dates, highest_prices - lowest_prices, 0,
-           lowest_prices, align='center', color=fc,
-           edgecolor=ec)
-    mp.bar(dates, closing_prices - opening_prices, 0.8,
-           opening_prices, align='center', color=fc,
-           edgecolor=ec)
+    candles.draw_candles(dates, opening_prices, highest_prices,
+                         lowest_prices, closing_prices, fc, ec)
     mp.gcf().autofmt_xdate()
 
 
@@ -140,34 +110,40 @@ def show_chart():
     mp.show()
 
 
-def main(argc, argv, envp):
-    dates, opening_prices, highest_prices, \
-        lowest_prices, closing_prices = read_data(
-            'aapl.csv')
-    pivots, supports, resistances = calc_pivots(
-        highest_prices, lowest_prices, closing_prices)
+def plot_chart(filename):
+    with instrument.stage('load', file=filename):
+        dates, opening_prices, highest_prices, \
+            lowest_prices, closing_prices = read_data(filename)
     predays = 5
-    for i in range(predays):
-        dates = np.append(dates, np.datetime64(
-            (pd.to_datetime(str(dates[-1])).date() +
-             pd.tseries.offsets.BDay()).strftime('%Y-%m-%d'),
-            'D'))
-    days = dates.astype(int)
-    trend_line = fit_line(
-        days[:-predays], pivots, days)
-    support_line = fit_line(
-        days[:-predays], supports, days)
-    resistance_line = fit_line(
-        days[:-predays], resistances, days)
-    init_chart(dates[0], dates[-1])
-    draw_candlestick(
-        dates[:-predays], opening_prices, highest_prices,
-        lowest_prices, closing_prices)
-    draw_pivots(dates[:-predays], pivots, supports, resistances)
-    draw_trend_line(dates, predays, trend_line)
-    draw_support_line(dates, predays, support_line)
-    draw_resistance_line(dates, predays, resistance_line)
-    show_chart()
+    with instrument.stage('compute', file=filename):
+        pivots, supports, resistances = calc_pivots(
+            highest_prices, lowest_prices, closing_prices)
+        # 一次生成之后的predays个交易日
+        dates = np.concatenate((
+            dates, tradingdays.next_days(dates[-1], predays)))
+        # 回归的x轴用交易日序号，周末和节假日不占位置
+        days = tradingdays.ordinals(dates)
+        trend_line, support_line, resistance_line = fit_lines(
+            days[:-predays], np.vstack((pivots, supports,
+                                        resistances)), days)
+    with instrument.stage('draw', file=filename):
+        init_chart(dates[0], dates[-1])
+        draw_candlestick(
+            dates[:-predays], opening_prices, highest_prices,
+            lowest_prices, closing_prices)
+        draw_pivots(dates[:-predays], pivots, supports,
+                    resistances)
+        draw_trend_line(dates, predays, trend_line)
+        draw_support_line(dates, predays, support_line)
+        draw_resistance_line(dates, predays, resistance_line)
+
+
+def main(argc, argv, envp):
+    instrument.configure(envp)
+    with instrument.stage('trendline'):
+        plot_chart('aapl.csv')
+        with instrument.stage('show'):
+            show_chart()
     return 0
 
 